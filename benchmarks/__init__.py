@@ -0,0 +1,7 @@
+import os
+
+# Benchmarks run against throwaway state; only fill in settings the caller left unset
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-benchmark-secret-0123")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("BLOCKLIST_BACKEND", "memory")  # No Redis server needed
@@ -0,0 +1,231 @@
+"""
+Times the functions every request runs through and fails when one slows down past its threshold.
+
+    python -m benchmarks.hot_paths --output hot_paths.json
+    python -m benchmarks.hot_paths --baseline hot_paths.json --threshold 10 --threshold-for verify_password=30
+
+Each case is called `number` times per round for `--rounds` rounds. The report
+gives the best and median microseconds per call. Allocations are measured in a
+separate tracemalloc pass so they do not distort the timings. That pass reports
+the peak memory allocated during a single call, plus the blocks still held
+after the pass (a leak check). With `--baseline`, a case fails when its median
+grew by more than its threshold in percent (`--threshold`, or per case via
+`--threshold-for`), and the run then exits with status 1. Redis is replaced by
+the in-process stand-in and the database is a throwaway in-memory SQLite.
+"""
+import argparse
+import array
+import asyncio
+import inspect
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlmodel import select
+
+from .inmemory_redis import InMemoryRedis
+from src.auth.dependencies import RoleChecker, get_current_user
+from src.auth.utils import create_access_token, decode_token, generate_passwd_hash, verified_token_cache, verify_password
+from src.database import redis as blocklist
+from src.database.blocklist import RedisBlocklistBackend
+from src.database.main import AsyncSessionLocal, init_db
+from src.responses import FastJSONResponse
+from src.users.models import User
+from src.users.schemas import PaginatedResponse
+from src.users.serializers import serialize_page, serialize_user
+
+PAGE_SIZES = (10, 100, 1000)
+DEFAULT_THRESHOLD_PCT = 10.0
+# bcrypt timings swing with CPU frequency and neighbours far more than the rest
+CASE_THRESHOLDS_PCT = {"verify_password": 25.0, "generate_passwd_hash": 25.0}
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], Any]  # Called with no arguments; may be a coroutine function
+    number: int  # Calls per timed round
+
+
+async def _call(fn: Callable[[], Any]) -> Any:
+    result = fn()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _time(case: Case, rounds: int) -> dict:
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(case.number):
+            await _call(case.fn)
+        per_call.append((time.perf_counter() - started) / case.number)
+    return {
+        "calls_per_round": case.number,
+        "rounds": rounds,
+        "best_us": round(min(per_call) * 1e6, 2),
+        "median_us": round(statistics.median(per_call) * 1e6, 2),
+    }
+
+
+async def _allocations(case: Case, calls: int) -> dict:
+    tracemalloc.start()
+    try:
+        await _call(case.fn)  # Let lazily created state settle outside the measurement
+        peaks = array.array("q", bytes(8 * calls))  # Preallocated so recording a peak allocates nothing
+        before = tracemalloc.take_snapshot()
+        for i in range(calls):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await _call(case.fn)
+            peaks[i] = tracemalloc.get_traced_memory()[1] - current
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return {
+        "peak_bytes_per_call": int(statistics.median(peaks)),
+        "retained_blocks": retained,
+        "traced_calls": calls,
+    }
+
+
+async def _build_cases() -> list[Case]:
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        session.add_all(
+            User(
+                firstname=f"First{i}",
+                lastname=f"Last{i}",
+                email=f"user{i}@example.com",
+                username=f"user{i}",
+                role="admin" if i == 0 else "user",
+                hashed_password="x",
+            )
+            for i in range(max(PAGE_SIZES))
+        )
+        await session.commit()
+        users = (await session.execute(select(User).order_by(User.created_at.desc(), User.id.desc()))).scalars().all()
+
+    blocklist.blocklist_backend = RedisBlocklistBackend(InMemoryRedis())
+    for _ in range(1000):
+        await blocklist.add_jti_to_blocklist(str(uuid.uuid4()))
+
+    admin = users[0]
+    claims = {"sub": admin.email, "id": str(admin.id), "role": admin.role, "ver": 0}
+    token = create_access_token(user_data=claims)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    live_jti = str(uuid.uuid4())
+    role_checker = RoleChecker(allowed_roles=["admin"])
+    password_hash = generate_passwd_hash("benchmark-password")
+
+    async def get_user_from_token():
+        async with AsyncSessionLocal() as session:
+            return await get_current_user(token=credentials, session=session)
+
+    def decode_token_uncached():
+        verified_token_cache.clear()
+        return decode_token(token)
+
+    cases = [
+        Case("create_access_token", lambda: create_access_token(user_data=claims), 2000),
+        Case("decode_token", lambda: decode_token(token), 20000),
+        Case("decode_token_uncached", decode_token_uncached, 2000),
+        Case("token_in_blocklist", lambda: blocklist.token_in_blocklist(live_jti), 20000),
+        Case("get_user_from_token", get_user_from_token, 2000),
+        Case("RoleChecker.__call__", lambda: role_checker(role="admin"), 100000),
+        Case("verify_password", lambda: verify_password("benchmark-password", password_hash), 3),
+        Case("generate_passwd_hash", lambda: generate_passwd_hash("benchmark-password"), 3),
+    ]
+    for size in PAGE_SIZES:
+        page = users[:size]
+        number = max(10, 20000 // size)
+        cases.append(Case(
+            f"PaginatedResponse[User]_{size}",
+            lambda page=page: PaginatedResponse[User].model_validate(
+                {"data": page, "has_more": True, "url": "u"}
+            ).model_dump_json(),
+            number,
+        ))
+        cases.append(Case(
+            f"serialize_page_orjson_{size}",
+            lambda page=page: FastJSONResponse(serialize_page(page, serialize_user, has_more=True, url="u")).body,
+            number,
+        ))
+    return cases
+
+
+async def main(rounds: int, only: list[str] | None) -> dict:
+    results = {}
+    for case in await _build_cases():
+        if only and case.name not in only:
+            continue
+        if case.name == "token_in_blocklist":
+            await blocklist.revoked_jti_filter.rebuild()  # The filter only answers while freshly synced
+        results[case.name] = {
+            **await _time(case, rounds),
+            **await _allocations(case, calls=min(case.number, 200)),
+        }
+    return results
+
+
+def compare(baseline: dict, current: dict, default_threshold: float, thresholds: dict) -> dict:
+    """Change in median time per case against `baseline`, and the cases that grew past their threshold."""
+    cases = {}
+    regressions = []
+    for name, stats in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        threshold = thresholds.get(name, default_threshold)
+        change = round((stats["median_us"] - before["median_us"]) / before["median_us"] * 100, 1)
+        cases[name] = {
+            "baseline_us": before["median_us"],
+            "current_us": stats["median_us"],
+            "change_pct": change,
+            "threshold_pct": threshold,
+        }
+        if change > threshold:
+            regressions.append(name)
+    return {"cases": cases, "regressions": regressions}
+
+
+def _parse_threshold(value: str) -> tuple[str, float]:
+    name, _, pct = value.rpartition("=")
+    if not name:
+        raise argparse.ArgumentTypeError("expected NAME=PERCENT")
+    return name, float(pct)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--case", action="append", dest="cases", help="only run this case (repeatable)")
+    parser.add_argument("--output", help="also write the results to this file, e.g. to serve as a later baseline")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PCT, help="allowed slowdown in percent")
+    parser.add_argument(
+        "--threshold-for", type=_parse_threshold, action="append", default=[], metavar="NAME=PERCENT",
+        help="allowed slowdown for one case (repeatable)",
+    )
+    args = parser.parse_args()
+
+    report = {"results": asyncio.run(main(args.rounds, args.cases))}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report["results"], f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(
+                json.load(f), report["results"], args.threshold, {**CASE_THRESHOLDS_PCT, **dict(args.threshold_for)}
+            )
+    print(json.dumps(report, indent=2))
+    if args.baseline and report["comparison"]["regressions"]:
+        sys.exit(1)
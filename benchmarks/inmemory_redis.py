@@ -0,0 +1,190 @@
+import asyncio
+import bisect
+import math
+import time
+
+
+class InMemoryRedis:
+    """
+    A small in-process stand-in for the subset of `redis.asyncio.Redis` the
+    service uses. `latency` adds a simulated network round-trip to every
+    command (or pipeline) so benchmarks reflect what a real server would cost.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.commands = 0
+        self._values: dict[str, tuple[str, float | None]] = {}
+        self._zsets: dict[str, dict[str, float]] = {}
+
+    async def _round_trip(self) -> None:
+        self.commands += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+
+    # Plain keys
+    def _get(self, name):
+        entry = self._values.get(name)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[name]
+            return None
+        return value
+
+    def _set(self, name, value, ex=None):
+        self._values[name] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def get(self, name):
+        await self._round_trip()
+        return self._get(name)
+
+    async def set(self, name, value, ex=None):
+        await self._round_trip()
+        return self._set(name, value, ex)
+
+    async def mget(self, keys):
+        await self._round_trip()
+        return [self._get(key) for key in keys]
+
+    async def exists(self, *names):
+        await self._round_trip()
+        return sum(self._get(name) is not None for name in names)
+
+    async def delete(self, *names):
+        await self._round_trip()
+        return sum(self._values.pop(name, None) is not None for name in names)
+
+    def _ttl(self, name):
+        if self._get(name) is None:
+            return -2
+        expires_at = self._values[name][1]
+        return -1 if expires_at is None else max(math.ceil(expires_at - time.monotonic()), 1)
+
+    async def ttl(self, name):
+        await self._round_trip()
+        return self._ttl(name)
+
+    def _incr(self, name):
+        value = int(self._get(name) or 0) + 1
+        self._values[name] = (str(value), self._values.get(name, (None, None))[1])
+        return value
+
+    async def incr(self, name):
+        await self._round_trip()
+        return self._incr(name)
+
+    # Sorted sets
+    @staticmethod
+    def _bound(value, default):
+        if value in ("-inf", "+inf"):
+            return default
+        return float(value)
+
+    def _zrangebyscore(self, name, min, max, withscores=False):
+        low, high = self._bound(min, float("-inf")), self._bound(max, float("inf"))
+        items = sorted(self._zsets.get(name, {}).items(), key=lambda item: item[1])
+        scores = [score for _, score in items]
+        selected = items[bisect.bisect_left(scores, low):bisect.bisect_right(scores, high)]
+        return selected if withscores else [member for member, _ in selected]
+
+    def _zadd(self, name, mapping):
+        self._zsets.setdefault(name, {}).update(mapping)
+        return len(mapping)
+
+    async def zadd(self, name, mapping):
+        await self._round_trip()
+        return self._zadd(name, mapping)
+
+    async def zrange(self, name, start, end):
+        await self._round_trip()
+        members = [member for member, _ in sorted(self._zsets.get(name, {}).items(), key=lambda item: item[1])]
+        return members[start:] if end == -1 else members[start:end + 1]
+
+    def _zscore(self, name, member):
+        return self._zsets.get(name, {}).get(member)
+
+    async def zscore(self, name, member):
+        await self._round_trip()
+        return self._zscore(name, member)
+
+    async def zrangebyscore(self, name, min, max, withscores=False):
+        await self._round_trip()
+        return self._zrangebyscore(name, min, max, withscores)
+
+    def _zremrangebyscore(self, name, min, max):
+        doomed = self._zrangebyscore(name, min, max)
+        for member in doomed:
+            del self._zsets[name][member]
+        return len(doomed)
+
+    async def zremrangebyscore(self, name, min, max):
+        await self._round_trip()
+        return self._zremrangebyscore(name, min, max)
+
+    async def publish(self, channel, message):
+        await self._round_trip()
+        return 0
+
+    async def ping(self):
+        await self._round_trip()
+        return True
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+
+class _Pipeline:
+    """Queues commands and applies them in a single simulated round-trip."""
+
+    def __init__(self, redis: InMemoryRedis) -> None:
+        self._redis = redis
+        self._queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._queued = []
+
+    def set(self, name, value, ex=None):
+        self._queued.append((self._redis._set, (name, value, ex)))
+        return self
+
+    def get(self, name):
+        self._queued.append((self._redis._get, (name,)))
+        return self
+
+    def incr(self, name):
+        self._queued.append((self._redis._incr, (name,)))
+        return self
+
+    def zadd(self, name, mapping):
+        self._queued.append((self._redis._zadd, (name, mapping)))
+        return self
+
+    def ttl(self, name):
+        self._queued.append((self._redis._ttl, (name,)))
+        return self
+
+    def zscore(self, name, member):
+        self._queued.append((self._redis._zscore, (name, member)))
+        return self
+
+    def zremrangebyscore(self, name, min, max):
+        self._queued.append((self._redis._zremrangebyscore, (name, min, max)))
+        return self
+
+    def publish(self, channel, message):
+        self._queued.append((lambda: 0, ()))
+        return self
+
+    async def execute(self):
+        await self._redis._round_trip()
+        results = [command(*args) for command, args in self._queued]
+        self._queued = []
+        return results
@@ -0,0 +1,318 @@
+"""
+Drives the whole service in-process with a realistic auth and user traffic mix and reports per-route latency.
+
+    python -m benchmarks.load_test --users 200 --concurrency 20 --actions 30 --output run.json
+    python -m benchmarks.load_test --baseline run.json --max-regression 15
+
+Requests go through the real `src.app` (lifespan included) over an ASGI
+transport, against a fresh SQLite file in a temp directory, with Redis replaced
+by the in-process stand-in. Every virtual user signs up, logs in, makes
+`--actions` requests drawn from a weighted mix of reads, updates and token
+refreshes, and then either logs out or deletes its account. `--preload-users`
+first fills the database with that many seeded users (see `benchmarks.seed`)
+so list and lookup queries run against a realistically sized table. Throughput and
+p50/p95/p99 latency are reported per route as JSON. With `--baseline`, each
+route is compared to a previous run's report; `--max-regression` makes the run
+exit with status 1 when any route's p95 grew by more than that percentage.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# A fresh file database per run, so WAL and the production profile behave as deployed;
+# this has to be in place before `src` creates its engines
+DATA_DIR = tempfile.mkdtemp(prefix="load-test-")
+DATABASE_PATH = os.path.join(DATA_DIR, "load_test.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+import httpx
+from sqlalchemy import update
+
+from .inmemory_redis import InMemoryRedis
+from .seed import seed_database
+from src import app
+from src.auth import utils as auth_utils
+from src.config import Config
+from src.database import redis as blocklist
+from src.database.blocklist import RedisBlocklistBackend
+from src.database.main import AsyncSessionLocal
+from src.users.models import User
+
+API = "/api/v1"
+PASSWORD = "load-test-password"
+
+# Relative frequency of the requests a signed-in user makes between login and logout
+ACTION_WEIGHTS = {
+    "me": 35,
+    "get_user": 30,
+    "list_users": 10,
+    "update_user": 15,
+    "refresh": 10,
+}
+
+
+class Recorder:
+    """Collects request latencies and status classes per route template."""
+
+    def __init__(self) -> None:
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.timings[route].append(time.perf_counter() - started)
+        self.statuses[route][f"{response.status_code // 100}xx"] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(self.timings):
+            timings = self.timings[route]
+            routes[route] = {
+                "requests": len(timings),
+                "throughput_rps": round(len(timings) / elapsed, 1),
+                "mean_ms": round(statistics.fmean(timings) * 1e3, 3),
+                **_percentiles(timings),
+                "max_ms": round(max(timings) * 1e3, 3),
+                "status": dict(sorted(self.statuses[route].items())),
+            }
+        total = sum(len(timings) for timings in self.timings.values())
+        return {
+            "duration_seconds": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1),
+            "server_errors": sum(statuses.get("5xx", 0) for statuses in self.statuses.values()),
+            "routes": routes,
+        }
+
+
+def _percentiles(timings: list) -> dict:
+    if len(timings) < 2:
+        value = round(timings[0] * 1e3, 3)
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1e3, 3),
+        "p95_ms": round(cuts[94] * 1e3, 3),
+        "p99_ms": round(cuts[98] * 1e3, 3),
+    }
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _sign_in(client: httpx.AsyncClient, recorder: Recorder, name: str) -> tuple:
+    """Signs `name` up and logs in, returning `(user_id, tokens)`."""
+    response = await recorder.request(client, "POST /auth/signup", "POST", f"{API}/auth/signup", json={
+        "firstname": f"First-{name}",
+        "lastname": f"Last-{name}",
+        "username": name,
+        "email": f"{name}@example.com",
+        "password": PASSWORD,
+    })
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    response = await recorder.request(client, "POST /auth/login", "POST", f"{API}/auth/login", json={
+        "email": f"{name}@example.com", "password": PASSWORD,
+    })
+    response.raise_for_status()
+    return user_id, response.json()
+
+
+async def _virtual_user(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    index: int,
+    actions: int,
+    delete_ratio: float,
+    seed: int,
+    admin_headers: dict,
+    user_ids: list,
+) -> None:
+    rng = random.Random(seed * 1_000_003 + index)
+    user_id, tokens = await _sign_in(client, recorder, f"user{index}")
+    user_ids.append(user_id)
+    headers = _bearer(tokens["access_token"])
+
+    names, weights = list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values())
+    for action in rng.choices(names, weights, k=actions):
+        if action == "me":
+            await recorder.request(client, "GET /users/me", "GET", f"{API}/users/me", headers=headers)
+        elif action == "get_user":
+            other = user_ids[rng.randrange(len(user_ids))]
+            await recorder.request(client, "GET /users/{user_id}", "GET", f"{API}/users/{other}", headers=headers)
+        elif action == "list_users":
+            await recorder.request(client, "GET /users/all", "GET", f"{API}/users/all?limit=20", headers=admin_headers)
+        elif action == "update_user":
+            await recorder.request(
+                client, "PATCH /users/{user_id}", "PATCH", f"{API}/users/{user_id}",
+                headers=headers, json={"firstname": f"First-{index}-{rng.randrange(1000)}"},
+            )
+        elif action == "refresh":
+            response = await recorder.request(
+                client, "POST /auth/refresh_token", "POST", f"{API}/auth/refresh_token",
+                headers=_bearer(tokens["refresh_token"]),
+            )
+            if response.status_code == 200:
+                tokens = response.json()
+                headers = _bearer(tokens["access_token"])
+
+    if rng.random() < delete_ratio:
+        await recorder.request(client, "DELETE /users/{user_id}", "DELETE", f"{API}/users/{user_id}", headers=headers)
+    else:
+        await recorder.request(client, "POST /auth/logout", "POST", f"{API}/auth/logout", headers=headers)
+
+
+async def _run_users(client, recorder, first: int, count: int, concurrency: int, **kwargs) -> None:
+    queue = asyncio.Queue()
+    for index in range(first, first + count):
+        queue.put_nowait(index)
+
+    async def worker():
+        while not queue.empty():
+            await _virtual_user(client, recorder, queue.get_nowait(), **kwargs)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _create_admin(client: httpx.AsyncClient) -> dict:
+    user_id, _ = await _sign_in(client, Recorder(), "admin")
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(User).where(User.email == "admin@example.com").values(role="admin"))
+        await session.commit()
+    # Log in again so the token carries the admin role
+    response = await client.post(f"{API}/auth/login", json={"email": "admin@example.com", "password": PASSWORD})
+    response.raise_for_status()
+    return _bearer(response.json()["access_token"])
+
+
+async def main(
+    users: int,
+    concurrency: int,
+    actions: int,
+    delete_ratio: float,
+    warmup_users: int,
+    seed: int,
+    redis_latency: float,
+    preload_users: int = 0,
+) -> dict:
+    if preload_users:
+        await seed_database(DATABASE_PATH, preload_users, seed=seed)
+    blocklist.blocklist_backend = RedisBlocklistBackend(InMemoryRedis(latency=redis_latency))
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        filter_task = None
+        if Config.BLOCKLIST_FILTER_ENABLED:
+            filter_task = asyncio.create_task(blocklist.revoked_jti_filter.run())
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+                admin_headers = await _create_admin(client)
+                options = dict(
+                    actions=actions, delete_ratio=delete_ratio, seed=seed,
+                    admin_headers=admin_headers, user_ids=[],
+                )
+                # Warm-up users fill the caches and connection pools; their timings are discarded
+                await _run_users(client, Recorder(), 0, warmup_users, min(concurrency, max(warmup_users, 1)), **options)
+
+                recorder = Recorder()
+                started = time.perf_counter()
+                await _run_users(client, recorder, warmup_users, users, concurrency, **options)
+                elapsed = time.perf_counter() - started
+        finally:
+            if filter_task is not None:
+                filter_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await filter_task
+
+    return {
+        "config": {
+            "users": users,
+            "concurrency": concurrency,
+            "actions_per_user": actions,
+            "delete_ratio": delete_ratio,
+            "seed": seed,
+            "preloaded_users": preload_users,
+            "redis_latency_seconds": redis_latency,
+            "bcrypt_rounds": auth_utils.passwd_context.handler("bcrypt").default_rounds,
+            "database_profile": Config.DATABASE_PROFILE,
+            "auth_mode": Config.AUTH_MODE,
+            "audit_log_mode": Config.AUDIT_LOG_MODE,
+        },
+        **recorder.report(elapsed),
+    }
+
+
+def _change(baseline: float, current: float) -> float | None:
+    return round((current - baseline) / baseline * 100, 1) if baseline else None
+
+
+def compare(baseline: dict, current: dict, max_regression: float | None) -> dict:
+    """
+    Per-route change (in percent) of the latency percentiles and throughput
+    against `baseline`, plus the routes whose p95 regressed past `max_regression`.
+    """
+    routes = {}
+    regressions = []
+    for route, stats in current["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if before is None:
+            continue
+        routes[route] = {
+            metric: {"baseline": before[metric], "current": stats[metric], "change_pct": _change(before[metric], stats[metric])}
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+        }
+        change = routes[route]["p95_ms"]["change_pct"]
+        if max_regression is not None and change is not None and change > max_regression:
+            regressions.append(route)
+    return {"routes": routes, "max_regression_pct": max_regression, "regressions": regressions}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100, help="virtual users measured")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users active at once")
+    parser.add_argument("--actions", type=int, default=30, help="requests per user between login and logout")
+    parser.add_argument("--delete-ratio", type=float, default=0.1, help="share of users that delete their account instead of logging out")
+    parser.add_argument("--warmup-users", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--preload-users", type=int, default=0, help="seeded users in the database before the run")
+    parser.add_argument("--redis-latency", type=float, default=0.0, help="simulated Redis round-trip in seconds")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="override the bcrypt cost (default: the service's)")
+    parser.add_argument("--output", help="also write the report to this file, e.g. to serve as a later baseline")
+    parser.add_argument("--baseline", help="a previous report to compare against")
+    parser.add_argument("--max-regression", type=float, default=None, help="fail when a route's p95 grows by more than this percent")
+    args = parser.parse_args()
+
+    if args.bcrypt_rounds is not None:
+        auth_utils.passwd_context.update(bcrypt__rounds=args.bcrypt_rounds)
+
+    try:
+        # The lifespan prints progress; keep stdout for the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            report = asyncio.run(main(
+                args.users, args.concurrency, args.actions, args.delete_ratio,
+                args.warmup_users, args.seed, args.redis_latency, args.preload_users,
+            ))
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(json.load(f), report, args.max_regression)
+    print(json.dumps(report, indent=2))
+    if args.baseline and report["comparison"]["regressions"]:
+        sys.exit(1)
@@ -0,0 +1,203 @@
+"""
+Fills a SQLite database with a large, deterministic synthetic set of users and their activity.
+
+    python -m benchmarks.seed --database /tmp/users.db --users 1000000
+    python -m benchmarks.seed --database database.db --users 50000 --deleted-ratio 0.2 --admin-ratio 0.01 --seed 7
+
+The schema comes from the service's own `init_db`. Rows are then written
+directly with `executemany`, in large transactions, with the `users` triggers
+and the secondary indexes dropped. The search index and indexes are rebuilt
+once at the end, and the triggers are put back exactly as they were. Every
+user shares one precomputed bcrypt hash of `--password`, so seeding never
+hashes per row and any seeded user can log in. Activity rows follow what the
+triggers would have written: a CREATE row, then a few UPDATE rows. The same
+`--seed` and sizes always produce the same ids, names, timestamps and activity.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.auth.utils import generate_passwd_hash
+from src.database.main import init_db
+
+# Timestamps are spread over the year before this instant, so runs on different days match
+ANCHOR = datetime(2025, 1, 1)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"  # How SQLAlchemy stores DateTime in SQLite
+ACTIVITY_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # How the triggers' datetime('now') stores performed_at
+BATCH_SIZE = 50_000  # Users generated, inserted and committed at a time
+
+FIRST_NAMES = [
+    "Ada", "Alan", "Amara", "Ana", "Bruno", "Chen", "Chloe", "Daniel", "Diego", "Elena",
+    "Emeka", "Fatima", "Grace", "Hana", "Hugo", "Ines", "Ivan", "Jade", "James", "Jonas",
+    "Kenji", "Lara", "Leila", "Liam", "Lucia", "Maya", "Mei", "Mohamed", "Nadia", "Noah",
+    "Olga", "Omar", "Priya", "Rafael", "Rosa", "Sara", "Sofia", "Tariq", "Tomas", "Yuki",
+]
+LAST_NAMES = [
+    "Adeyemi", "Almeida", "Becker", "Cohen", "Costa", "Dubois", "Eriksen", "Fischer", "Garcia", "Hansen",
+    "Ivanova", "Jensen", "Kim", "Kowalski", "Lopez", "Martin", "Meyer", "Moreau", "Nakamura", "Novak",
+    "Okafor", "Park", "Patel", "Rossi", "Santos", "Schmidt", "Silva", "Smith", "Tanaka", "Wang",
+]
+
+USER_COLUMNS = (
+    "id", "firstname", "lastname", "email", "username", "role",
+    "hashed_password", "is_deleted", "created_at", "version", "deleted_at",
+)
+ACTIVITY_COLUMNS = ("user_id", "action", "performed_at", "details")
+
+
+def _details(**values) -> str:
+    return json.dumps(values, separators=(",", ":"))  # Same shape as SQLite's json_object()
+
+
+def _generate(
+    rng: random.Random,
+    start: int,
+    count: int,
+    deleted_ratio: float,
+    admin_ratio: float,
+    activity_per_user: int,
+    password_hash: str,
+) -> tuple[list, list]:
+    """Rows for users `start` .. `start + count - 1` and their activity, drawn from `rng`."""
+    span = (ANCHOR - timedelta(days=365), ANCHOR)
+    span_seconds = (span[1] - span[0]).total_seconds()
+    users, activity = [], []
+    for i in range(start, start + count):
+        user_id = uuid.UUID(int=rng.getrandbits(128), version=4).hex
+        firstname, lastname = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email = f"{firstname}.{lastname}.{i}@example.com".lower()
+        created = span[0] + timedelta(seconds=rng.random() * span_seconds)
+        role = "admin" if rng.random() < admin_ratio else "user"
+
+        activity.append((user_id, "CREATE", created.strftime(ACTIVITY_TIMESTAMP_FORMAT), _details(
+            firstname=firstname, lastname=lastname, email=email,
+        )))
+        performed = created
+        updates = rng.randint(0, 2 * activity_per_user)
+        for _ in range(updates):
+            performed += timedelta(seconds=rng.random() * (ANCHOR - performed).total_seconds() / 2)
+            new_firstname = rng.choice(FIRST_NAMES)
+            activity.append((user_id, "UPDATE", performed.strftime(ACTIVITY_TIMESTAMP_FORMAT), _details(
+                old_firstname=firstname, new_firstname=new_firstname,
+                old_lastname=lastname, new_lastname=lastname,
+                old_email=email, new_email=email,
+            )))
+            firstname = new_firstname
+
+        deleted_at = None
+        if rng.random() < deleted_ratio:
+            deleted = performed + timedelta(seconds=rng.random() * (ANCHOR - performed).total_seconds())
+            deleted_at = deleted.strftime(TIMESTAMP_FORMAT)
+            updates += 1
+            activity.append((user_id, "UPDATE", deleted.strftime(ACTIVITY_TIMESTAMP_FORMAT), _details(
+                old_firstname=firstname, new_firstname=firstname,
+                old_lastname=lastname, new_lastname=lastname,
+                old_email=email, new_email=email,
+            )))
+
+        users.append((
+            user_id, firstname, lastname, email, f"{firstname}{lastname}{i}".lower(), role,
+            password_hash, deleted_at is not None, created.strftime(TIMESTAMP_FORMAT), 1 + updates, deleted_at,
+        ))
+    return users, activity
+
+
+def _insert(table: str, columns: tuple, rows: list) -> tuple[str, list]:
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+
+
+async def seed_database(
+    path: str,
+    users: int,
+    seed: int = 1,
+    deleted_ratio: float = 0.05,
+    admin_ratio: float = 0.001,
+    activity_per_user: int = 2,
+    password: str = "password123",
+) -> dict:
+    """
+    Seeds the SQLite file at `path` (created if missing) and returns counts and
+    timings. The database must not contain users yet.
+    """
+    started = time.perf_counter()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        await init_db(engine)
+    finally:
+        await engine.dispose()
+
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        if connection.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None:
+            raise SystemExit(f"{path} already contains users; seed a fresh database")
+
+        # Losing a half-seeded throwaway database to a crash is fine
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("PRAGMA cache_size=-262144")  # 256 MiB
+        connection.execute("PRAGMA temp_store=MEMORY")
+
+        dropped = connection.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE type IN ('trigger', 'index') AND tbl_name IN ('users', 'user_activity_logs') AND sql IS NOT NULL"
+        ).fetchall()
+        for kind, name, _ in dropped:
+            connection.execute(f"DROP {kind.upper()} {name}")
+
+        rng = random.Random(seed)
+        password_hash = generate_passwd_hash(password)
+        totals = {"users": 0, "deleted": 0, "admins": 0, "activity_logs": 0}
+        for start in range(0, users, BATCH_SIZE):
+            user_rows, activity_rows = _generate(
+                rng, start, min(BATCH_SIZE, users - start),
+                deleted_ratio, admin_ratio, activity_per_user, password_hash,
+            )
+            connection.execute("BEGIN")
+            connection.executemany(*_insert("users", USER_COLUMNS, user_rows))
+            connection.executemany(*_insert("user_activity_logs", ACTIVITY_COLUMNS, activity_rows))
+            connection.execute("COMMIT")
+            totals["users"] += len(user_rows)
+            totals["deleted"] += sum(row[7] for row in user_rows)
+            totals["admins"] += sum(row[5] == "admin" for row in user_rows)
+            totals["activity_logs"] += len(activity_rows)
+        inserted = time.perf_counter()
+
+        connection.execute("BEGIN")
+        connection.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+        for kind, _, sql in sorted(dropped, key=lambda item: item[0] != "index"):  # Indexes before triggers
+            connection.execute(sql)
+        connection.execute("COMMIT")
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+
+    finished = time.perf_counter()
+    return {
+        **totals,
+        "seed": seed,
+        "insert_seconds": round(inserted - started, 2),
+        "index_seconds": round(finished - inserted, 2),
+        "total_seconds": round(finished - started, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", required=True, help="SQLite file to create or fill")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--deleted-ratio", type=float, default=0.05, help="share of users soft-deleted")
+    parser.add_argument("--admin-ratio", type=float, default=0.001, help="share of users with the admin role")
+    parser.add_argument("--activity-per-user", type=int, default=2, help="average UPDATE rows per user")
+    parser.add_argument("--password", default="password123", help="password every seeded user logs in with")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(seed_database(
+        args.database, args.users, args.seed, args.deleted_ratio,
+        args.admin_ratio, args.activity_per_user, args.password,
+    )), indent=2))
@@ -0,0 +1,131 @@
+"""
+Compares the orjson fast path of GET /users/all with the pydantic response_model path it replaced.
+
+    python -m benchmarks.user_serialization --requests 500 --limit 100
+
+Both variants serve the same page from a throwaway in-memory database through
+the full ASGI stack. The legacy route is only registered by this script.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import Depends, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import app
+from src.auth.utils import create_access_token
+from src.database.main import AsyncSessionLocal, get_read_session, init_db
+from src.users.models import User
+from src.users.pagination import encode_cursor
+from src.users.routes import admin_only, user_service
+from src.users.schemas import PaginatedResponse
+from src.users.serializers import serialize_page, serialize_user
+from src.responses import FastJSONResponse
+
+LEGACY_PATH = "/benchmark/users/all-legacy"
+
+
+@app.get(LEGACY_PATH, response_model=PaginatedResponse[User], response_class=JSONResponse, dependencies=[admin_only])
+async def legacy_get_all_users(
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    limit: int = Query(default=10, ge=1, le=100),
+) -> PaginatedResponse[User]:
+    users, has_more = await user_service.get_all_users(session=session, limit=limit)
+    return PaginatedResponse(
+        data=users,
+        has_more=has_more,
+        url=str(request.url),
+        next_cursor=encode_cursor(users[-1].created_at, users[-1].id) if users else None,
+        previous_cursor=encode_cursor(users[0].created_at, users[0].id) if users else None,
+    )
+
+
+async def _seed(count: int) -> str:
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        session.add_all(
+            User(
+                firstname=f"First{i}",
+                lastname=f"Last{i}",
+                email=f"user{i}@example.com",
+                username=f"user{i}",
+                role="admin" if i == 0 else "user",
+                hashed_password="x",
+            )
+            for i in range(count)
+        )
+        await session.commit()
+    return create_access_token(user_data={"sub": "user0@example.com", "id": str(uuid.uuid4()), "role": "admin"})
+
+
+async def _time_requests(client: httpx.AsyncClient, path: str, headers: dict, requests: int) -> dict:
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return {
+        "requests": requests,
+        "mean_ms": round(statistics.fmean(timings) * 1e3, 3),
+        "p50_ms": round(statistics.median(timings) * 1e3, 3),
+        "bytes": len(response.content),
+    }
+
+
+def _time_encoding(users: list, rounds: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        page = PaginatedResponse[User].model_validate({"data": users, "has_more": True, "url": "u"})
+        json.dumps(page.model_dump(mode="json")).encode()
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        FastJSONResponse(serialize_page(users, serialize_user, has_more=True, url="u")).body
+    fast = time.perf_counter() - started
+    return {
+        "rounds": rounds,
+        "legacy_us_per_page": round(legacy / rounds * 1e6, 1),
+        "orjson_us_per_page": round(fast / rounds * 1e6, 1),
+    }
+
+
+async def main(requests: int, limit: int) -> dict:
+    token = await _seed(max(limit, 1) + 1)
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        fast_path = f"/api/v1/users/all?limit={limit}"
+        legacy_path = f"{LEGACY_PATH}?limit={limit}"
+        # Warm up both routes (token cache, user cache, statement cache)
+        await _time_requests(client, fast_path, headers, 10)
+        await _time_requests(client, legacy_path, headers, 10)
+
+        results = {
+            "legacy_response_model": await _time_requests(client, legacy_path, headers, requests),
+            "orjson_fast_path": await _time_requests(client, fast_path, headers, requests),
+        }
+
+    async with AsyncSessionLocal() as session:
+        users, _ = await user_service.get_all_users(session=session, limit=limit)
+    results["encoding_only"] = _time_encoding(users, rounds=requests)
+    results["speedup_p50"] = round(
+        results["legacy_response_model"]["p50_ms"] / results["orjson_fast_path"]["p50_ms"], 2
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.requests, args.limit)), indent=2))
@@ -0,0 +1,34 @@
+"""users keyset pagination index
+
+Revision ID: 2b9c4f1d7e3a
+Revises: efbe7a67ab45
+Create Date: 2026-10-17 10:12:31.418204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9c4f1d7e3a'
+down_revision: Union[str, Sequence[str], None] = 'efbe7a67ab45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_users_is_deleted_created_at_id',
+        'users',
+        ['is_deleted', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_is_deleted_created_at_id', table_name='users')
@@ -0,0 +1,41 @@
+"""user activity logs indexes
+
+Revision ID: 4d7a9c2e5b18
+Revises: 9f4b2d6a1c37
+Create Date: 2026-10-17 15:02:44.630871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d7a9c2e5b18'
+down_revision: Union[str, Sequence[str], None] = '9f4b2d6a1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_user_activity_logs_user_id_performed_at',
+        'user_activity_logs',
+        ['user_id', 'performed_at'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_user_activity_logs_performed_at',
+        'user_activity_logs',
+        ['performed_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_activity_logs_performed_at', table_name='user_activity_logs')
+    op.drop_index('ix_user_activity_logs_user_id_performed_at', table_name='user_activity_logs')
@@ -0,0 +1,29 @@
+"""users deleted_at
+
+Revision ID: 6c1e8a3f9b20
+Revises: 2b9c4f1d7e3a
+Create Date: 2026-10-17 13:05:48.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1e8a3f9b20'
+down_revision: Union[str, Sequence[str], None] = '2b9c4f1d7e3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'deleted_at')
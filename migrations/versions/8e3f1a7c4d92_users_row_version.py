@@ -0,0 +1,29 @@
+"""users row version
+
+Revision ID: 8e3f1a7c4d92
+Revises: 4d7a9c2e5b18
+Create Date: 2026-10-17 16:18:27.305146
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3f1a7c4d92'
+down_revision: Union[str, Sequence[str], None] = '4d7a9c2e5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'version')
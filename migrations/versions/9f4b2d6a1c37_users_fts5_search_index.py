@@ -0,0 +1,73 @@
+"""users fts5 search index
+
+Revision ID: 9f4b2d6a1c37
+Revises: 6c1e8a3f9b20
+Create Date: 2026-10-17 14:21:09.117350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f4b2d6a1c37'
+down_revision: Union[str, Sequence[str], None] = '6c1e8a3f9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE users_fts USING fts5(
+            firstname, lastname, username, email,
+            content='users', content_rowid='rowid', prefix='2 3'
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER users_fts_insert
+        AFTER INSERT ON users
+        BEGIN
+            INSERT INTO users_fts(rowid, firstname, lastname, username, email)
+            VALUES (NEW.rowid, NEW.firstname, NEW.lastname, NEW.username, NEW.email);
+        END;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER users_fts_delete
+        AFTER DELETE ON users
+        BEGIN
+            INSERT INTO users_fts(users_fts, rowid, firstname, lastname, username, email)
+            VALUES ('delete', OLD.rowid, OLD.firstname, OLD.lastname, OLD.username, OLD.email);
+        END;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER users_fts_update
+        AFTER UPDATE OF firstname, lastname, username, email ON users
+        BEGIN
+            INSERT INTO users_fts(users_fts, rowid, firstname, lastname, username, email)
+            VALUES ('delete', OLD.rowid, OLD.firstname, OLD.lastname, OLD.username, OLD.email);
+            INSERT INTO users_fts(rowid, firstname, lastname, username, email)
+            VALUES (NEW.rowid, NEW.firstname, NEW.lastname, NEW.username, NEW.email);
+        END;
+        """
+    )
+    # Index the users that already exist
+    op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS users_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS users_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS users_fts_insert")
+    op.execute("DROP TABLE IF EXISTS users_fts")
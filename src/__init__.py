@@ -1,12 +1,22 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
 
 from src.auth.errors import register_auth_errors
 from src.auth.routes import auth_router
+from src.auth.utils import password_hash_pool
+from src.compression import CompressionMiddleware
+from src.config import Config
 from src.database.main import init_db
+from src.database.redis import blocklist_backend, reconcile_revocations, revoked_jti_filter
+from src.metrics import MetricsMiddleware, metrics_router
+from src.query_budget import QueryBudgetMiddleware
+from src.responses import FastJSONResponse
+from src.users.audit import audit_log
+from src.users.cache import listen_for_invalidations
+from src.users.retention import run_activity_retention
 from src.users.routes import user_router
 from src.users.errors import register_user_errors
 
@@ -15,7 +25,25 @@ from src.users.errors import register_user_errors
 async def lifespan(app: FastAPI):
     print("Initializing database...")
     await init_db()
+    if blocklist_backend.remote:
+        await reconcile_revocations()
+    background_tasks = []
+    if Config.USER_CACHE_SHARED_INVALIDATION:
+        background_tasks.append(asyncio.create_task(listen_for_invalidations()))
+    if Config.BLOCKLIST_FILTER_ENABLED and blocklist_backend.remote:
+        background_tasks.append(asyncio.create_task(revoked_jti_filter.run()))
+    if audit_log.enabled:
+        background_tasks.append(asyncio.create_task(audit_log.run()))
+    if Config.ACTIVITY_RETENTION_DAYS > 0:
+        background_tasks.append(asyncio.create_task(run_activity_retention()))
     yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await audit_log.flush()
+    password_hash_pool.shutdown()
+    await blocklist_backend.close()
     print("Server has been stopped")
 
 logger = logging.getLogger(__name__)
@@ -26,7 +54,8 @@ app = FastAPI(
     title="User Data Service for 10,000 users",
     description="A Rest API User Management Backend",
     version=version,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 @app.exception_handler(Exception)
@@ -36,7 +65,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
     This is a fallback for all errors not caught by specific handlers.
     """
     logger.error(f"Unhandled exception for request {request.url}: {exc}", exc_info=True)
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": {
@@ -48,6 +77,20 @@ async def generic_exception_handler(request: Request, exc: Exception):
         },
     )
 
+if Config.QUERY_BUDGET_ENABLED:
+    app.add_middleware(QueryBudgetMiddleware)
+if Config.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=Config.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=Config.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=Config.COMPRESSION_BROTLI_QUALITY,
+    )
+if Config.METRICS_ENABLED:
+    # Added last so it is outermost and its timings include compression
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
 register_user_errors(app)
 register_auth_errors(app)
 
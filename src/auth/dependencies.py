@@ -4,9 +4,11 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Literal, List, Any
 
-from src.database.redis import token_in_blocklist
-from src.database.main import get_session
+from src.config import Config
+from src.database.redis import token_in_blocklist, get_user_version
+from src.database.main import get_read_session
 from src.users.models import User
+from src.users.cache import user_cache
 from .errors import InvalidCredentialsException, TokenRevokedException, TokenExpiredException, InvalidTokenException, InsufficientPermissionsException
 from src.auth.utils import decode_token
 from src.auth.service import AuthService
@@ -15,6 +17,42 @@ bearer_scheme = HTTPBearer()
 auth_service = AuthService()
 
 
+async def verify_token(token: str, token_type: Literal["access", "refresh"]) -> dict:
+    """
+    Runs every check a token must pass (signature, expiry, blocklist, type and
+    user version) and returns its payload.
+    """
+    try:
+        payload = decode_token(token)
+        if payload is None:
+            raise InvalidTokenException("Could not validate credentials")
+
+        # Blocklist check for both token types
+        if await token_in_blocklist(payload.get("jti")):
+            raise TokenRevokedException("Token has been revoked")
+
+    except jwt.ExpiredSignatureError:
+        raise TokenExpiredException("Token has expired")
+    except jwt.InvalidTokenError:
+        raise InvalidTokenException("Invalid token")
+
+    # Ensure the token is of the expected type
+    if payload.get("type") != token_type:
+        raise InvalidTokenException(
+            f"Invalid token type, expected '{token_type}' token"
+        )
+
+    user_claims = payload.get("user", {})
+    if not user_claims.get("sub") or not user_claims.get("id"):
+        raise InvalidTokenException("Token is missing user information")
+
+    # Tokens issued before the user's version was last bumped are revoked
+    if user_claims.get("ver", 0) < await get_user_version(user_claims["id"]):
+        raise TokenRevokedException("Token has been revoked")
+
+    return payload
+
+
 def get_user_from_token(token_type: Literal["access", "refresh"]):
     """
     A dependency factory to get a user from a token of a specific type.
@@ -22,35 +60,20 @@ def get_user_from_token(token_type: Literal["access", "refresh"]):
     """
     async def _get_user(
         token: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
     ) -> User:
-        try:
-            payload = decode_token(token.credentials)
-            if payload is None:
-                raise InvalidTokenException("Could not validate credentials")
-
-            # Blocklist check for both token types
-            if await token_in_blocklist(payload.get("jti")):
-                raise TokenRevokedException("Token has been revoked")
-
-        except jwt.ExpiredSignatureError:
-            raise TokenExpiredException("Token has expired")
-        except jwt.InvalidTokenError:
-            raise InvalidTokenException("Invalid token")
-
-        # Ensure the token is of the expected type
-        if payload.get("type") != token_type:
-            raise InvalidTokenException(
-                f"Invalid token type, expected '{token_type}' token"
-            )
-
-        email: str = payload.get("user", {}).get("sub")
-        if not email:
-            raise InvalidTokenException("Token is missing user information")
+        payload = await verify_token(token.credentials, token_type)
+        email: str = payload["user"]["sub"]
 
+        user = user_cache.get(email)
+        if user is not None:
+            return user
+
+        snapshot = user_cache.snapshot()
         user = await auth_service.get_user_by_email(email=email, session=session)
         if user is None:
             raise InvalidCredentialsException("User from token not found")
+        user_cache.put(user, snapshot)
         return user
     return _get_user
 
@@ -67,36 +90,47 @@ def validate_token(token_type: Literal["access", "refresh"]):
     async def _validate_token(
         token: HTTPAuthorizationCredentials = Depends(bearer_scheme),
     ) -> dict:
-        try:
-            payload = decode_token(token.credentials)
-            if payload is None:
-                raise InvalidTokenException("Could not validate credentials")
-    
-            if await token_in_blocklist(payload.get("jti")):
-                raise TokenRevokedException("Token has been revoked")
-    
-        except jwt.ExpiredSignatureError:
-            raise TokenExpiredException("Token has expired")
-        except jwt.InvalidTokenError:
-            raise InvalidTokenException("Invalid token")
-    
-        if payload.get("type") != token_type:
-            raise InvalidTokenException(
-                f"Invalid token type, expected '{token_type}' token"
-            )
-    
-        return payload
+        return await verify_token(token.credentials, token_type)
     return _validate_token
 
 validate_access_token = validate_token("access")
 
 
+async def _role_from_user(current_user: User = Depends(get_current_user)) -> str:
+    return current_user.role
+
+
+async def _role_from_claims(
+    payload: dict = Depends(validate_access_token),
+    session: AsyncSession = Depends(get_read_session),
+) -> str:
+    role = payload["user"].get("role")
+    if role is None:
+        # Tokens issued before the role claim was added still need the row
+        user = await auth_service.get_user_by_email(email=payload["user"]["sub"], session=session)
+        if user is None:
+            raise InvalidCredentialsException("User from token not found")
+        role = user.role
+    return role
+
+
+# In "claims" mode routes that only need an authenticated caller, and RoleChecker,
+# are served from the verified token alone; role changes and deletions bump the
+# user's version, which revokes the tokens carrying the old claims.
+if Config.AUTH_MODE == "claims":
+    require_authentication = validate_access_token
+    get_current_role = _role_from_claims
+else:
+    require_authentication = get_current_user
+    get_current_role = _role_from_user
+
+
 class RoleChecker:
     def __init__(self, allowed_roles: List[str]) -> None:
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: User = Depends(get_current_user)) -> Any:
-        if current_user.role in self.allowed_roles:
+    def __call__(self, role: str = Depends(get_current_role)) -> Any:
+        if role in self.allowed_roles:
             return True
-        
-        raise InsufficientPermissionsException("You are not allowed to perform this action")
\ No newline at end of file
+
+        raise InsufficientPermissionsException("You are not allowed to perform this action")
@@ -1,8 +1,8 @@
 from typing import Any, Callable
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
 from fastapi import FastAPI, status
 
+from src.database.blocklist import BlocklistUnavailableError
 from src.users.errors import create_exception_handler
 
 
@@ -36,6 +36,11 @@ class InsufficientPermissionsException(AuthException):
     pass
 
 
+class PasswordHashingBusyException(AuthException):
+    """Raised when the password hashing pool queue is full."""
+    pass
+
+
 def register_auth_errors(app: FastAPI):
     """Registers all custom auth exception handlers with the FastAPI app."""
     app.add_exception_handler(
@@ -57,4 +62,12 @@ def register_auth_errors(app: FastAPI):
     app.add_exception_handler(
         InsufficientPermissionsException,
         create_exception_handler(status.HTTP_403_FORBIDDEN, "permission_error", "insufficient_permissions")
+    )
+    app.add_exception_handler(
+        PasswordHashingBusyException,
+        create_exception_handler(status.HTTP_503_SERVICE_UNAVAILABLE, "api_error", "service_busy")
+    )
+    app.add_exception_handler(
+        BlocklistUnavailableError,
+        create_exception_handler(status.HTTP_503_SERVICE_UNAVAILABLE, "api_error", "service_unavailable")
     )
\ No newline at end of file
@@ -2,14 +2,14 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database.redis import add_jti_to_blocklist
-from src.database.main import get_session
+from src.database.redis import add_jti_to_blocklist, bump_user_version
+from src.database.main import get_session, get_read_session
 from src.users.models import User
 from .schemas import UserCreateSchema, TokenSchema, UserLoginSchema
 from .errors import InvalidCredentialsException
 from .service import AuthService
 from .dependencies import get_current_user, get_user_from_refresh_token, validate_access_token
-from .utils import create_access_token, verify_password
+from .utils import create_access_token, verify_password_async
 
 auth_router = APIRouter()
 auth_service = AuthService()
@@ -28,14 +28,14 @@ async def create_user_account(
 @auth_router.post("/login", response_model=TokenSchema)
 async def login_for_access_token(
     login_data: UserLoginSchema,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Authenticate user and return an access token."""
     user = await auth_service.get_user_by_email(email=login_data.email, session=session)
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await verify_password_async(login_data.password, user.hashed_password):
         raise InvalidCredentialsException("Incorrect email or password")
     
-    token_data = {"sub": user.email, "id": str(user.id)}
+    token_data = await auth_service.token_claims(user)
     access_token = create_access_token(user_data=token_data, refresh=False)
     refresh_token = create_access_token(user_data=token_data, refresh=True)
 
@@ -45,8 +45,8 @@ async def login_for_access_token(
 @auth_router.post("/refresh_token", response_model=TokenSchema)
 async def refresh_access_token(current_user: User = Depends(get_user_from_refresh_token)):
     """Generate a new access and refresh token."""
-    token_data = {"sub": current_user.email, "id": str(current_user.id), "role":current_user.role}
-    
+    token_data = await auth_service.token_claims(current_user)
+
     access_token = create_access_token(user_data=token_data, refresh=False)
     refresh_token = create_access_token(user_data=token_data, refresh=True)
 
@@ -63,11 +63,29 @@ async def revoke_token(
     """
     jti = payload.get("jti")
     if jti:
-        await add_jti_to_blocklist(jti)
+        await add_jti_to_blocklist(jti, expires_at=payload.get("exp"))
     
     return JSONResponse(
         content={
             "message": "Logged out successfully"
         },
         status_code=status.HTTP_200_OK
-    )
\ No newline at end of file
+    )
+
+
+@auth_router.post("/logout_all")
+async def revoke_all_tokens(
+    payload: dict = Depends(validate_access_token),
+):
+    """
+    Logs the user out of every session by bumping their token version, which
+    revokes all access and refresh tokens issued to them so far.
+    """
+    await bump_user_version(payload["user"]["id"])
+
+    return JSONResponse(
+        content={
+            "message": "Logged out of all sessions successfully"
+        },
+        status_code=status.HTTP_200_OK
+    )
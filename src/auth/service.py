@@ -1,11 +1,18 @@
+import uuid
+
 from sqlmodel import select
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.users.models import User
+from src.users.cache import user_cache
+from src.users.audit import audit_log
+from src.database.redis import get_user_version, bump_user_version
 
-from src.users.errors import UsernameConflictException, EmailConflictException
+from src.users.errors import conflict_from_integrity_error
 from .schemas import UserCreateSchema
-from .utils import generate_passwd_hash
+from .utils import generate_passwd_hash_async
 
 
 class AuthService:
@@ -18,34 +25,59 @@ class AuthService:
 
         return user
 
-    async def create_user(self, user_data: UserCreateSchema, session: AsyncSession):
-        # Check if username or email already exists
-        stmt = select(User).where((User.username == user_data.username) | (User.email == user_data.email))
-        existing_user = (await session.execute(stmt)).scalars().first()
-        if existing_user:
-            if existing_user.username == user_data.username:
-                raise UsernameConflictException("Username already registered")
-            if existing_user.email == user_data.email:
-                raise EmailConflictException("Email already registered")
+    async def token_claims(self, user: User) -> dict:
+        """The user claims embedded in every access and refresh token."""
+        return {
+            "sub": user.email,
+            "id": str(user.id),
+            "role": user.role,
+            # Read through to Redis: a stale version would get the new token revoked
+            "ver": await get_user_version(str(user.id), use_cache=False),
+        }
 
+    async def create_user(self, user_data: UserCreateSchema, session: AsyncSession):
         user_dict = user_data.model_dump()
         password = user_dict.pop("password")
-        user_dict["hashed_password"] = generate_passwd_hash(password)
+        user_dict["hashed_password"] = await generate_passwd_hash_async(password)
 
-        new_user = User(**user_dict)
-        new_user.role = "user"
-        
-        session.add(new_user)
-        await session.commit()
-        await session.refresh(new_user)
+        # One INSERT ... RETURNING; the unique indexes on username/email report conflicts
+        stmt = (
+            insert(User)
+            .values(id=uuid.uuid4(), role="user", is_deleted=False, **user_dict)
+            .returning(User)
+        )
+        try:
+            new_user = (await session.scalars(stmt)).one()
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            conflict = conflict_from_integrity_error(e)
+            if conflict is None:
+                raise
+            raise conflict
+
+        await audit_log.created(new_user.id, new_user.firstname, new_user.lastname, new_user.email)
         return new_user
 
 
     async def update_user(self, user:User , user_data: dict,session:AsyncSession):
+        old = {field: getattr(user, field) for field in ("firstname", "lastname", "email", "is_deleted")}
 
-        for k, v in user_data.items():
-            setattr(user, k, v)
+        # The database increments the version, so concurrent updates never hand out the same ETag
+        stmt = (
+            update(User)
+            .where(User.id == user.id)
+            .values(**user_data, version=User.version + 1)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        user = (await session.scalars(stmt)).one()
 
         await session.commit()
+        await audit_log.updated(user.id, old, {field: getattr(user, field) for field in old})
+        await user_cache.invalidate(user.id)
+        if "role" in user_data or "email" in user_data:
+            # Outstanding tokens carry the old role/email claims
+            await bump_user_version(str(user.id))
 
-        return user
\ No newline at end of file
+        return user
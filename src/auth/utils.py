@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
 import logging
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 
@@ -7,6 +12,8 @@ import jwt
 from passlib.context import CryptContext
 
 from src.config import Config
+from src.metrics import password_hash_duration, registry
+from .errors import PasswordHashingBusyException
 
 passwd_context = CryptContext(schemes=["bcrypt"])
 
@@ -25,6 +32,98 @@ def verify_password(password: str, hash: str) -> bool:
     return passwd_context.verify(password, hash)
 
 
+class PasswordHashPool:
+    """
+    Runs bcrypt work on a bounded worker pool so a burst of logins or signups
+    never blocks the event loop. At most `workers` jobs run at once and at most
+    `max_queue` wait for a slot; anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, workers: int, max_queue: int, use_processes: bool = False) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(workers)
+
+        # Metrics
+        self.queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="passwd-hash")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHashingBusyException("Too many authentication requests, please retry shortly")
+
+        self.queue_depth += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        try:
+            wait = time.perf_counter() - queued_at
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            try:
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+            finally:
+                password_hash_duration.labels(fn.__name__).observe(time.perf_counter() - started)
+        finally:
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.total_wait_seconds / self.completed if self.completed else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(
+    workers=Config.PASSWORD_HASH_WORKERS,
+    max_queue=Config.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=Config.PASSWORD_HASH_EXECUTOR == "process",
+)
+registry.callback("password_hash_queue_depth", "bcrypt jobs waiting for a worker", lambda: password_hash_pool.queue_depth)
+registry.callback(
+    "password_hash_rejected", "bcrypt jobs rejected because the queue was full",
+    lambda: password_hash_pool.rejected, kind="counter",
+)
+
+
+async def generate_passwd_hash_async(password: str) -> str:
+    """Non-blocking `generate_passwd_hash` for use inside request handlers."""
+    return await password_hash_pool.run(generate_passwd_hash, password)
+
+
+async def verify_password_async(password: str, hash: str) -> bool:
+    """Non-blocking `verify_password` for use inside request handlers."""
+    return await password_hash_pool.run(verify_password, password, hash)
+
+
 def create_access_token(
     user_data: dict, expiry: timedelta = None, refresh: bool = False
 ):
@@ -45,14 +144,88 @@ def create_access_token(
     return token
 
 
+class VerifiedTokenCache:
+    """
+    Remembers the outcome of verifying a token string so repeat requests with
+    the same bearer token skip signature verification and JSON parsing.
+
+    Valid payloads are kept until their `exp`; tokens that failed verification
+    are remembered as `None` for a short while, in a separate and smaller LRU
+    so a flood of junk tokens cannot evict valid ones. Entries are keyed by a
+    digest of the token rather than the token itself. Cached payloads are
+    shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_size: int, negative_ttl_seconds: float, negative_max_size: int) -> None:
+        self.max_size = max_size
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.negative_max_size = negative_max_size
+        self._entries: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+        self._invalid: "OrderedDict[bytes, float]" = OrderedDict()  # Key -> when to forget it
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes):
+        """Returns `(hit, payload)`; `payload` is None for a cached invalid token."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, payload = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return True, payload
+            del self._entries[key]
+            return False, None
+
+        expires_at = self._invalid.get(key)
+        if expires_at is None:
+            return False, None
+        if expires_at <= time.time():
+            del self._invalid[key]
+            return False, None
+        self._invalid.move_to_end(key)
+        return True, None
+
+    def put(self, key: bytes, payload: dict | None) -> None:
+        if payload is None:
+            entries, max_size, value = self._invalid, self.negative_max_size, time.time() + self.negative_ttl_seconds
+        else:
+            entries, max_size, value = self._entries, self.max_size, (payload.get("exp", 0), payload)
+        if max_size <= 0:
+            return
+
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > max_size:
+            entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalid.clear()
+
+
+verified_token_cache = VerifiedTokenCache(
+    max_size=Config.TOKEN_CACHE_MAX_SIZE,
+    negative_ttl_seconds=Config.TOKEN_NEGATIVE_CACHE_SECONDS,
+    negative_max_size=Config.TOKEN_NEGATIVE_CACHE_MAX_SIZE,
+)
+
+
 def decode_token(token: str) -> dict:
+    key = verified_token_cache.key(token)
+    hit, token_data = verified_token_cache.get(key)
+    if hit:
+        return token_data
+
     try:
         token_data = jwt.decode(
             jwt=token, key=Config.JWT_SECRET, algorithms=[Config.JWT_ALGORITHM]
         )
 
-        return token_data
-
     except jwt.PyJWTError as e:
         logging.exception(e)
-        return None
\ No newline at end of file
+        token_data = None
+
+    verified_token_cache.put(key, token_data)
+    return token_data
@@ -0,0 +1,78 @@
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it every client gets gzip
+    brotli = None
+
+THREAD_MINIMUM_SIZE = 128 * 1024  # Larger chunks are compressed off the event loop
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """Whether an `Accept-Encoding` header lists `encoding` with a non-zero quality."""
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() != encoding:
+            continue
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.quality = quality
+        self._compressor = None
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        if more_body:
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least `minimum_size` bytes with Brotli when it is
+    installed and the client accepts it, and otherwise with gzip if the client
+    accepts that (`q=0` counts as refusing). Responses that are already encoded
+    or of an already-compressed type (such as gzipped exports) are passed
+    through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        if brotli is not None and accepts_encoding(accept_encoding, "br"):
+            await BrotliResponder(self.app, self.minimum_size, self.brotli_quality)(scope, receive, send)
+        elif accepts_encoding(accept_encoding, "gzip"):
+            await self.gzip(scope, receive, send)
+        else:
+            # GZipMiddleware alone would gzip for any mention of gzip, even `gzip;q=0`
+            await IdentityResponder(self.app, self.minimum_size)(scope, receive, send)
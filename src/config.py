@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,8 +7,78 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     JWT_SECRET: str
     JWT_ALGORITHM: str
+    # "production" applies WAL and tuned pragmas to a file-backed SQLite database and
+    # splits it into a single-writer engine and a read-only pool
+    DATABASE_PROFILE: Literal["default", "production"] = "default"
+    SQLITE_READ_POOL_SIZE: int = 8
+    SQLITE_WRITE_POOL_TIMEOUT: float = 30  # Longest a write waits for the single writer connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Covers writers in other worker processes
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379  
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0  # Longest wait for a free pooled connection
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    REDIS_CONNECT_TIMEOUT: float = 0.5
+    # "redis" shares revocations between workers; "memory" keeps them in-process (single worker, tests)
+    BLOCKLIST_BACKEND: Literal["redis", "memory"] = "redis"
+    BLOCKLIST_CIRCUIT_BREAKER: bool = True  # Fail fast with a 503 while Redis keeps erroring or timing out
+    BLOCKLIST_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    BLOCKLIST_CIRCUIT_RESET_SECONDS: float = 10
+    # bcrypt runs in this pool instead of on the event loop
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 256  # Waiting hash jobs beyond this are rejected with a 503
+    # Users resolved from tokens are cached per worker; set either to 0 to disable
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 30
+    USER_CACHE_SHARED_INVALIDATION: bool = False  # Broadcast invalidations to other workers over Redis
+    # "database" loads the user row for every authenticated request; "claims" authorizes
+    # RoleChecker and id-only routes from the token (role, ver) without touching the database
+    AUTH_MODE: Literal["database", "claims"] = "database"
+    USER_VERSION_CACHE_SECONDS: float = 1.0  # Worst-case delay before a bumped user version is seen
+    # Verified token payloads are cached until they expire, invalid tokens briefly
+    TOKEN_CACHE_MAX_SIZE: int = 50_000
+    TOKEN_NEGATIVE_CACHE_SECONDS: float = 30
+    TOKEN_NEGATIVE_CACHE_MAX_SIZE: int = 1_000  # Kept apart so junk tokens cannot evict valid ones
+    BULK_IMPORT_BATCH_SIZE: int = 500  # Rows per conflict query, INSERT and commit in /users/import
+    BULK_ACTION_CHUNK_SIZE: int = 500  # Rows per UPDATE/DELETE and commit in the /users/bulk/* endpoints
+    # "trigger" writes user_activity_logs inside every user mutation's transaction; "queue"
+    # has the service layer queue events that a background task inserts in batches
+    # (events still queued when the process dies are lost)
+    AUDIT_LOG_MODE: Literal["trigger", "queue"] = "trigger"
+    AUDIT_QUEUE_MAX_SIZE: int = 10_000  # Writers wait once this many events are unflushed
+    AUDIT_FLUSH_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0  # Longest an event waits for its batch to fill
+    # Activity log rows older than this are moved to gzip NDJSON files, one per month; 0 keeps them forever
+    ACTIVITY_RETENTION_DAYS: int = 0
+    ACTIVITY_ARCHIVE_DIR: str = "archive/activity"
+    ACTIVITY_ARCHIVE_CHUNK_SIZE: int = 1000  # Rows per DELETE and commit
+    ACTIVITY_RETENTION_INTERVAL_SECONDS: float = 3600
+    # Responses of at least COMPRESSION_MINIMUM_SIZE bytes are sent gzip- or, when the
+    # brotli package is installed and the client accepts it, Brotli-encoded
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Prometheus metrics on /metrics: request, SQL, pool checkout, blocklist and bcrypt timings
+    METRICS_ENABLED: bool = True
+    # When set, /metrics requires `Authorization: Bearer <token>`; leave unset only if
+    # the endpoint is unreachable from outside (e.g. blocked at the proxy)
+    METRICS_TOKEN: Optional[str] = None
+    # Per-request SQL accounting: a Server-Timing header on every response, and a logged
+    # report of the queries behind any request that exceeds one of these budgets
+    QUERY_BUDGET_ENABLED: bool = True
+    QUERY_BUDGET_MAX_STATEMENTS: int = 10
+    QUERY_BUDGET_MAX_DB_SECONDS: float = 0.1
+    SLOW_QUERY_SECONDS: float = 0.05
+    N_PLUS_ONE_THRESHOLD: int = 5  # Runs of one statement within a request that suggest an N+1
+    # Local Bloom filter of revoked JTIs so unrevoked tokens skip the Redis lookup
+    BLOCKLIST_FILTER_ENABLED: bool = True
+    BLOCKLIST_FILTER_CAPACITY: int = 100_000
+    BLOCKLIST_FILTER_ERROR_RATE: float = 0.001
+    BLOCKLIST_FILTER_SYNC_SECONDS: float = 1.0  # Worst-case delay before another worker's logout is seen
 
     model_config = SettingsConfigDict(
         env_file= ".env",
@@ -0,0 +1,277 @@
+import asyncio
+import bisect
+import heapq
+import time
+from abc import ABC, abstractmethod
+from typing import List, Sequence, Tuple
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+REVOKED_JTIS_KEY = "revoked-jtis"  # Sorted set of jti -> revocation time, which workers' filters sync from
+REVOKED_JTI_EXPIRIES_KEY = "revoked-jti-expiries"  # Sorted set of jti -> token expiry: every revocation still in force
+REVOCATION_LOG_RETENTION = 600  # Seconds of revocation log kept for delta syncs; a worker further behind rebuilds
+USER_VERSION_KEY = "user-version:{}"  # Per-user counter; tokens carrying an older `ver` claim are revoked
+
+
+class BlocklistUnavailableError(Exception):
+    """Raised when the blocklist store cannot be reached or its circuit is open."""
+    pass
+
+
+class BlocklistBackend(ABC):
+    """Storage for revoked JTIs and per-user token versions."""
+
+    # Whether lookups leave the process; a local filter only pays off for remote stores
+    remote: bool = True
+
+    @abstractmethod
+    async def add(self, jti: str, ttl: int, revoked_at: float) -> None:
+        """
+        Revokes `jti` for `ttl` seconds and records it in the revocation log.
+        Expired revocations and log entries past retention are trimmed as it goes.
+        """
+
+    @abstractmethod
+    async def unexpired(self, now: float) -> List[str]:
+        """Returns every revoked JTI whose token has not expired by `now`."""
+
+    @abstractmethod
+    async def contains(self, jti: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def contains_many(self, jtis: Sequence[str]) -> List[bool]:
+        """Checks several JTIs in a single round-trip."""
+
+    @abstractmethod
+    async def revoked_since(self, since: float) -> List[Tuple[str, float]]:
+        """Returns `(jti, revoked_at)` for every revocation logged at or after `since`."""
+
+    @abstractmethod
+    async def reconcile(self, now: float) -> None:
+        """
+        Gives every logged revocation an expiry entry, so `unexpired` returns it,
+        then trims as `add` does. Revocations written before expiries were kept
+        exist only in the log.
+        """
+
+    @abstractmethod
+    async def get_user_version(self, user_id: str) -> int:
+        ...
+
+    @abstractmethod
+    async def bump_user_version(self, user_id: str) -> int:
+        ...
+
+    @abstractmethod
+    async def bump_user_versions(self, user_ids: Sequence[str]) -> List[int]:
+        """Bumps several users' versions in a single round-trip."""
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBlocklistBackend(BlocklistBackend):
+    """Blocklist kept in Redis, shared by every worker."""
+
+    def __init__(self, client: aioredis.Redis) -> None:
+        self.client = client
+
+    async def add(self, jti: str, ttl: int, revoked_at: float) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(name=jti, value="", ex=ttl)
+            pipe.zadd(REVOKED_JTIS_KEY, {jti: revoked_at})
+            pipe.zadd(REVOKED_JTI_EXPIRIES_KEY, {jti: revoked_at + ttl})
+            self._trim(pipe, revoked_at)
+            await pipe.execute()
+
+    def _trim(self, pipe, now: float) -> None:
+        pipe.zremrangebyscore(REVOKED_JTIS_KEY, "-inf", now - REVOCATION_LOG_RETENTION)
+        pipe.zremrangebyscore(REVOKED_JTI_EXPIRIES_KEY, "-inf", now)
+
+    async def unexpired(self, now: float) -> List[str]:
+        return await self.client.zrangebyscore(REVOKED_JTI_EXPIRIES_KEY, now, "+inf")
+
+    async def contains(self, jti: str) -> bool:
+        return await self.client.get(jti) is not None
+
+    async def contains_many(self, jtis: Sequence[str]) -> List[bool]:
+        if not jtis:
+            return []
+        return [value is not None for value in await self.client.mget(list(jtis))]
+
+    async def revoked_since(self, since: float) -> List[Tuple[str, float]]:
+        return await self.client.zrangebyscore(REVOKED_JTIS_KEY, since, "+inf", withscores=True)
+
+    async def reconcile(self, now: float) -> None:
+        logged = await self.client.zrange(REVOKED_JTIS_KEY, 0, -1)
+        if logged:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for jti in logged:
+                    pipe.zscore(REVOKED_JTI_EXPIRIES_KEY, jti)
+                    pipe.ttl(jti)
+                results = await pipe.execute()
+            # The key's TTL is what is left of the token's lifetime; a missing key has expired
+            missing = {
+                jti: now + ttl
+                for jti, expires_at, ttl in zip(logged, results[::2], results[1::2])
+                if expires_at is None and ttl > 0
+            }
+            if missing:
+                await self.client.zadd(REVOKED_JTI_EXPIRIES_KEY, missing)
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            self._trim(pipe, now)
+            await pipe.execute()
+
+    async def get_user_version(self, user_id: str) -> int:
+        return int(await self.client.get(USER_VERSION_KEY.format(user_id)) or 0)
+
+    async def bump_user_version(self, user_id: str) -> int:
+        return await self.client.incr(USER_VERSION_KEY.format(user_id))
+
+    async def bump_user_versions(self, user_ids: Sequence[str]) -> List[int]:
+        if not user_ids:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.incr(USER_VERSION_KEY.format(user_id))
+            return await pipe.execute()
+
+    async def close(self) -> None:
+        await self.client.connection_pool.disconnect()
+
+
+class InMemoryBlocklistBackend(BlocklistBackend):
+    """
+    Blocklist held in this process. Suitable for single-worker deployments and
+    for running the service without a Redis server; nothing is shared or persisted.
+    """
+
+    remote = False
+
+    def __init__(self) -> None:
+        self._expiries: dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []  # (expires_at, jti), for trimming in expiry order
+        self._log: List[Tuple[float, str]] = []  # (revoked_at, jti), kept sorted
+        self._user_versions: dict[str, int] = {}
+
+    async def add(self, jti: str, ttl: int, revoked_at: float) -> None:
+        expires_at = revoked_at + ttl
+        self._expiries[jti] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, jti))
+        bisect.insort(self._log, (revoked_at, jti))
+        self._trim(revoked_at)
+
+    def _trim(self, now: float) -> None:
+        del self._log[:bisect.bisect_left(self._log, (now - REVOCATION_LOG_RETENTION,))]
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, jti = heapq.heappop(self._expiry_heap)
+            if self._expiries.get(jti) == expires_at:  # Not re-revoked since
+                del self._expiries[jti]
+
+    def _contains(self, jti: str) -> bool:
+        expires_at = self._expiries.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._expiries[jti]
+            return False
+        return True
+
+    async def contains(self, jti: str) -> bool:
+        return self._contains(jti)
+
+    async def unexpired(self, now: float) -> List[str]:
+        return [jti for jti in list(self._expiries) if self._contains(jti)]
+
+    async def contains_many(self, jtis: Sequence[str]) -> List[bool]:
+        return [self._contains(jti) for jti in jtis]
+
+    async def revoked_since(self, since: float) -> List[Tuple[str, float]]:
+        start = bisect.bisect_left(self._log, (since,))
+        return [(jti, revoked_at) for revoked_at, jti in self._log[start:]]
+
+    async def reconcile(self, now: float) -> None:
+        self._trim(now)
+
+    async def get_user_version(self, user_id: str) -> int:
+        return self._user_versions.get(user_id, 0)
+
+    async def bump_user_version(self, user_id: str) -> int:
+        self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+        return self._user_versions[user_id]
+
+    async def bump_user_versions(self, user_ids: Sequence[str]) -> List[int]:
+        return [await self.bump_user_version(user_id) for user_id in user_ids]
+
+
+class CircuitBreakerBackend(BlocklistBackend):
+    """
+    Wraps another backend and fails fast once it keeps erroring or timing out.
+
+    After `failure_threshold` consecutive failures the circuit opens and every
+    call raises `BlocklistUnavailableError` immediately for `reset_seconds`.
+    Calls are then let through again: a success closes the circuit, another
+    failure re-opens it straight away.
+    """
+
+    def __init__(self, backend: BlocklistBackend, failure_threshold: int, reset_seconds: float, call_timeout: float) -> None:
+        self.backend = backend
+        self.remote = backend.remote
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.call_timeout = call_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_seconds
+
+    async def _call(self, method: str, *args):
+        if self.is_open:
+            raise BlocklistUnavailableError("Token blocklist is unavailable")
+
+        try:
+            result = await asyncio.wait_for(getattr(self.backend, method)(*args), self.call_timeout)
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            raise BlocklistUnavailableError("Token blocklist is unavailable") from e
+
+        self.failures = 0
+        self.opened_at = None
+        return result
+
+    async def add(self, jti: str, ttl: int, revoked_at: float) -> None:
+        return await self._call("add", jti, ttl, revoked_at)
+
+    async def contains(self, jti: str) -> bool:
+        return await self._call("contains", jti)
+
+    async def contains_many(self, jtis: Sequence[str]) -> List[bool]:
+        return await self._call("contains_many", jtis)
+
+    async def unexpired(self, now: float) -> List[str]:
+        return await self._call("unexpired", now)
+
+    async def revoked_since(self, since: float) -> List[Tuple[str, float]]:
+        return await self._call("revoked_since", since)
+
+    async def reconcile(self, now: float) -> None:
+        return await self._call("reconcile", now)
+
+    async def get_user_version(self, user_id: str) -> int:
+        return await self._call("get_user_version", user_id)
+
+    async def bump_user_version(self, user_id: str) -> int:
+        return await self._call("bump_user_version", user_id)
+
+    async def bump_user_versions(self, user_ids: Sequence[str]) -> List[int]:
+        return await self._call("bump_user_versions", user_ids)
+
+    async def close(self) -> None:
+        await self.backend.close()
@@ -1,24 +1,129 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlmodel import SQLModel, text
 from src.config import Config
+from src.metrics import instrument_engine
+from src.query_budget import track_queries
 from src.users import models # Import the models module to ensure they are registered with SQLModel's metadata
 from sqlalchemy.orm import sessionmaker
 
 
-
-engine = create_async_engine(
-    url=Config.DATABASE_URL,
-    echo=False # Should be False in production
+_url = make_url(Config.DATABASE_URL)
+# The production profile needs a file-backed SQLite database; anything else keeps one default engine
+SQLITE_PRODUCTION = (
+    Config.DATABASE_PROFILE == "production"
+    and _url.get_backend_name() == "sqlite"
+    and _url.database not in (None, "", ":memory:")
 )
 
+
+def _sqlite_pragmas(read_only: bool):
+    """Builds a connect-event listener applying the production pragmas to every new connection."""
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run alongside the single writer instead of blocking on it
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last commits on power loss, never corruption
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={Config.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{Config.SQLITE_CACHE_SIZE_KB}")  # Negative means KiB
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return apply
+
+
+if SQLITE_PRODUCTION:
+    # SQLite allows one writer at a time; a single pooled connection queues writers
+    # in-process instead of letting them fail with "database is locked"
+    engine = create_async_engine(
+        url=Config.DATABASE_URL,
+        echo=False, # Should be False in production
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=Config.SQLITE_WRITE_POOL_TIMEOUT,
+    )
+    read_engine = create_async_engine(
+        url=Config.DATABASE_URL,
+        echo=False,
+        pool_size=Config.SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+    )
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+    event.listen(read_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+else:
+    engine = create_async_engine(
+        url=Config.DATABASE_URL,
+        echo=False # Should be False in production
+    )
+    read_engine = engine
+
+if Config.METRICS_ENABLED:
+    instrument_engine(engine, "primary")
+    if read_engine is not engine:
+        instrument_engine(read_engine, "read")
+
+# Always hooked, so assert_max_queries works even with the budget middleware off;
+# outside a request or collect_queries block each hook is a single ContextVar read
+track_queries(engine)
+if read_engine is not engine:
+    track_queries(read_engine)
+
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+# FTS5 index over the searchable user columns. It is an external-content table
+# keyed by the users rowid; run `INSERT INTO users_fts(users_fts) VALUES ('rebuild')`
+# after a VACUUM, which may renumber the rowids of a table without an INTEGER PRIMARY KEY.
+USERS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        firstname, lastname, username, email,
+        content='users', content_rowid='rowid', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert
+    AFTER INSERT ON users
+    BEGIN
+        INSERT INTO users_fts(rowid, firstname, lastname, username, email)
+        VALUES (NEW.rowid, NEW.firstname, NEW.lastname, NEW.username, NEW.email);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete
+    AFTER DELETE ON users
+    BEGIN
+        INSERT INTO users_fts(users_fts, rowid, firstname, lastname, username, email)
+        VALUES ('delete', OLD.rowid, OLD.firstname, OLD.lastname, OLD.username, OLD.email);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF firstname, lastname, username, email ON users
+    BEGIN
+        INSERT INTO users_fts(users_fts, rowid, firstname, lastname, username, email)
+        VALUES ('delete', OLD.rowid, OLD.firstname, OLD.lastname, OLD.username, OLD.email);
+        INSERT INTO users_fts(rowid, firstname, lastname, username, email)
+        VALUES (NEW.rowid, NEW.firstname, NEW.lastname, NEW.username, NEW.email);
+    END;
+    """,
+]
+
 
 # Create database tables
-async def init_db():
-    async with engine.begin() as conn:
+async def init_db(bind: AsyncEngine | None = None):
+    """Creates the schema, activity-log triggers and search index on `bind` (the app's engine by default)."""
+    async with (bind or engine).begin() as conn:
         # Drop all tables first (useful for development to apply schema changes)
         # await conn.run_sync(SQLModel.metadata.drop_all) # This deletes all data on restart
         await conn.run_sync(SQLModel.metadata.create_all)
@@ -83,13 +188,37 @@ async def init_db():
             """
         )
 
-        await conn.execute(insert_trigger)
-        await conn.execute(delete_trigger)
-        await conn.execute(update_trigger)
+        if Config.AUDIT_LOG_MODE == "trigger":
+            await conn.execute(insert_trigger)
+            await conn.execute(delete_trigger)
+            await conn.execute(update_trigger)
+        else:
+            # The service layer queues activity events instead (see src/users/audit.py)
+            for name in ("log_user_create", "log_user_delete", "log_user_update"):
+                await conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+        # Full-text index behind /users/search, kept in sync with `users` by triggers
+        fts_exists = (await conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+        ))).first() is not None
+        for statement in USERS_FTS_DDL:
+            await conn.execute(text(statement))
+        if not fts_exists:
+            # Index any users that were created before the search index existed
+            await conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
 
 
 # Session Dependency
 async def get_session() -> AsyncSession:
     """Dependency to get a new database session for each request."""
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_read_session() -> AsyncSession:
+    """
+    Dependency for handlers that only read. In the SQLite production profile
+    it draws from a separate read-only pool, so reads never wait on the writer.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
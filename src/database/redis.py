@@ -1,26 +1,266 @@
+import asyncio
+import logging
+import math
+import time
+
 from redis import asyncio as aioredis
 from src.config import Config
+from src.metrics import blocklist_call_duration
+from .bloom import BloomFilter
+from .blocklist import (
+    BlocklistBackend,
+    BlocklistUnavailableError,
+    CircuitBreakerBackend,
+    InMemoryBlocklistBackend,
+    REVOCATION_LOG_RETENTION,
+    RedisBlocklistBackend,
+)
 
-JTI_EXPIRY = 3600
+logger = logging.getLogger(__name__)
 
-token_blocklist = aioredis.Redis(
-    host = Config.REDIS_HOST,
-    port= Config.REDIS_PORT,
-    db=0,
-    decode_responses=True # Ensures keys and values are returned as strings
-)
+JTI_EXPIRY = 3600  # Fallback TTL for a revoked JTI whose token expiry is unknown
+# Only access tokens are revoked one by one, so after this long every JTI a filter was built with has expired
+FILTER_REBUILD_SECONDS = 3600
+USER_INVALIDATION_CHANNEL = "user-cache-invalidations"
+SYNC_OVERLAP_SECONDS = 5  # Re-read this much of the previous window to absorb clock skew between workers
 
-# Function to add a token to our blocklist 
-async def add_jti_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(
-        name=jti,
-        value="",
-        ex=JTI_EXPIRY
+def create_redis_client() -> aioredis.Redis:
+    # A blocking pool makes callers wait (up to REDIS_POOL_TIMEOUT) for a free
+    # connection instead of opening an unbounded number of them under load
+    pool = aioredis.BlockingConnectionPool(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        db=0,
+        max_connections=Config.REDIS_MAX_CONNECTIONS,
+        timeout=Config.REDIS_POOL_TIMEOUT,
+        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+        decode_responses=True, # Ensures keys and values are returned as strings
     )
+    return aioredis.Redis(connection_pool=pool)
+
+
+def create_blocklist_backend() -> BlocklistBackend:
+    if Config.BLOCKLIST_BACKEND == "memory":
+        return InMemoryBlocklistBackend()
+
+    backend = RedisBlocklistBackend(redis_client)
+    if Config.BLOCKLIST_CIRCUIT_BREAKER:
+        backend = CircuitBreakerBackend(
+            backend,
+            failure_threshold=Config.BLOCKLIST_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=Config.BLOCKLIST_CIRCUIT_RESET_SECONDS,
+            call_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        )
+    return backend
+
+
+# Connections are only opened on first use, so a memory-backed deployment never touches Redis
+redis_client = create_redis_client()
+blocklist_backend = create_blocklist_backend()
+
+
+class RevokedJtiFilter:
+    """
+    A per-worker Bloom filter of every revoked JTI.
+
+    Most tokens were never revoked, so a negative answer from the filter lets
+    `token_in_blocklist` skip Redis entirely; only possible hits are confirmed
+    with a GET. The filter is rebuilt from the unexpired revocations on
+    start-up, whenever it fills up and once its entries have all had time to
+    expire, and is kept current in between by fetching the newest entries of
+    the revocation log. If syncing stalls the filter stops answering and every
+    check goes to Redis.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._filter: BloomFilter | None = None
+        self._pending: list[str] | None = None  # Local revocations made while a rebuild is in flight
+        self._synced_until = 0.0  # Revocation log position (a revocation time) read up to
+        self._last_sync = 0.0
+        self._built_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._filter is not None
+            and time.monotonic() - self._last_sync < self.sync_interval * 5
+        )
+
+    def might_contain(self, jti: str) -> bool:
+        return self._filter.might_contain(jti)
+
+    def add(self, jti: str) -> None:
+        if self._filter is not None:
+            self._filter.add(jti)
+        if self._pending is not None:
+            self._pending.append(jti)
+
+    async def rebuild(self) -> None:
+        self._pending = []
+        try:
+            now = time.time()
+            await blocklist_backend.reconcile(now)
+            jtis = await blocklist_backend.unexpired(now)
+
+            bloom = BloomFilter(capacity=max(self.capacity, len(jtis) * 2), error_rate=self.error_rate)
+            for jti in jtis + self._pending:
+                bloom.add(jti)
+
+            self._filter = bloom
+            self._synced_until = now  # Revocations logged from here on arrive through `sync`
+            self._built_at = self._last_sync = time.monotonic()
+        finally:
+            self._pending = None
+
+    async def sync(self) -> None:
+        entries = await blocklist_backend.revoked_since(self._synced_until - SYNC_OVERLAP_SECONDS)
+        for jti, score in entries:
+            self._filter.add(jti)
+            self._synced_until = max(self._synced_until, score)
+        self._last_sync = time.monotonic()
+
+    async def run(self) -> None:
+        """Background task keeping the filter in step with revocations made by any worker."""
+        while True:
+            try:
+                if (
+                    self._filter is None
+                    or self._filter.is_saturated
+                    or time.monotonic() - self._built_at > FILTER_REBUILD_SECONDS
+                    # The log entries this worker has not read yet may have been pruned
+                    or time.monotonic() - self._last_sync > REVOCATION_LOG_RETENTION / 2
+                ):
+                    await self.rebuild()
+                else:
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Could not sync the revoked JTI filter: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+
+async def reconcile_revocations() -> None:
+    """
+    Brings revocations recorded only in the log, by an older release, into the
+    set filters are rebuilt from. Runs at start-up, before any logout trims the log.
+    """
+    try:
+        await blocklist_backend.reconcile(time.time())
+    except BlocklistUnavailableError as e:
+        logger.warning(f"Could not reconcile the token blocklist: {e}")
+
+
+revoked_jti_filter = RevokedJtiFilter(
+    capacity=Config.BLOCKLIST_FILTER_CAPACITY,
+    error_rate=Config.BLOCKLIST_FILTER_ERROR_RATE,
+    sync_interval=Config.BLOCKLIST_FILTER_SYNC_SECONDS,
+)
+
+# Resolved once so the hot paths never build label tuples
+_contains_duration = blocklist_call_duration.labels("contains")
+_add_duration = blocklist_call_duration.labels("add")
+_get_user_version_duration = blocklist_call_duration.labels("get_user_version")
+_bump_user_version_duration = blocklist_call_duration.labels("bump_user_version")
+
+def _filter_active() -> bool:
+    return Config.BLOCKLIST_FILTER_ENABLED and blocklist_backend.remote and revoked_jti_filter.ready
+
+# Function to add a token to our blocklist until the token itself expires
+async def add_jti_to_blocklist(jti: str, expires_at: float | None = None) -> None:
+    now = time.time()
+    ttl = max(1, math.ceil(expires_at - now)) if expires_at is not None else JTI_EXPIRY
+    started = time.perf_counter()
+    try:
+        await blocklist_backend.add(jti, ttl, now)
+    finally:
+        _add_duration.observe(time.perf_counter() - started)
+    revoked_jti_filter.add(jti)
 
 # Function to check if a token is in our blocklist
 async def token_in_blocklist(jti: str) -> bool:
-    # The new library returns strings (due to decode_responses=True) or None
-    redis_result = await token_blocklist.get(jti)
+    if _filter_active() and not revoked_jti_filter.might_contain(jti):
+        return False
+
+    started = time.perf_counter()
+    try:
+        return await blocklist_backend.contains(jti)
+    finally:
+        _contains_duration.observe(time.perf_counter() - started)
+
+# Function to check several tokens in one round-trip
+async def tokens_in_blocklist(jtis: list[str]) -> list[bool]:
+    if not _filter_active():
+        return await blocklist_backend.contains_many(jtis)
+
+    results = [False] * len(jtis)
+    candidates = [i for i, jti in enumerate(jtis) if revoked_jti_filter.might_contain(jti)]
+    found = await blocklist_backend.contains_many([jtis[i] for i in candidates])
+    for i, revoked in zip(candidates, found):
+        results[i] = revoked
+    return results
+
+# Recently read user versions, so the per-request check rarely needs Redis
+_user_versions: dict[str, tuple[float, int]] = {}
+_USER_VERSIONS_MAX_SIZE = 100_000
+
+# Function to get the current token version of a user. While the store is
+# unavailable the last version this worker saw is served instead, so the
+# version check alone never turns authenticated traffic into 503s; a user
+# whose version was never seen still fails.
+async def get_user_version(user_id: str, use_cache: bool = True) -> int:
+    now = time.monotonic()
+    cached = _user_versions.get(user_id)
+    if use_cache and cached is not None and cached[0] > now:
+        return cached[1]
+
+    started = time.perf_counter()
+    try:
+        version = await blocklist_backend.get_user_version(user_id)
+    except BlocklistUnavailableError:
+        if use_cache and cached is not None:
+            return cached[1]
+        raise
+    finally:
+        _get_user_version_duration.observe(time.perf_counter() - started)
+    if len(_user_versions) >= _USER_VERSIONS_MAX_SIZE:
+        _user_versions.clear()
+    _user_versions[user_id] = (now + Config.USER_VERSION_CACHE_SECONDS, version)
+    return version
+
+# Function to invalidate every token issued to a user so far
+async def bump_user_version(user_id: str) -> int:
+    started = time.perf_counter()
+    try:
+        version = await blocklist_backend.bump_user_version(user_id)
+    finally:
+        _bump_user_version_duration.observe(time.perf_counter() - started)
+    _user_versions[user_id] = (time.monotonic() + Config.USER_VERSION_CACHE_SECONDS, version)
+    return version
+
+# Function to invalidate the tokens of several users in one round-trip
+async def bump_user_versions(user_ids: list[str]) -> list[int]:
+    started = time.perf_counter()
+    try:
+        versions = await blocklist_backend.bump_user_versions(user_ids)
+    finally:
+        _bump_user_version_duration.observe(time.perf_counter() - started)
+    expires_at = time.monotonic() + Config.USER_VERSION_CACHE_SECONDS
+    for user_id, version in zip(user_ids, versions):
+        _user_versions[user_id] = (expires_at, version)
+    return versions
+
+# Function to tell every worker that a cached user is stale
+async def publish_user_invalidation(user_id: str) -> None:
+    await redis_client.publish(USER_INVALIDATION_CHANNEL, user_id)
 
-    return redis_result is not None 
\ No newline at end of file
+# Function to publish several invalidations in one round-trip
+async def publish_user_invalidations(user_ids: list[str]) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id in user_ids:
+            pipe.publish(USER_INVALIDATION_CHANNEL, user_id)
+        await pipe.execute()
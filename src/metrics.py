@@ -0,0 +1,296 @@
+import secrets
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Header, Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.auth.errors import InvalidTokenException
+from src.config import Config
+
+# Upper bounds in seconds, matching the Prometheus client defaults for request latency
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+HASH_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_string(names: Sequence[str], values: Sequence[str]) -> str:
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """
+        The child for one combination of label values. Children are created once
+        and kept, so callers on hot paths should look them up once and hold on to them.
+        """
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child(_label_string(self.labelnames, values))
+        return child
+
+    def _new_child(self, labels: str):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for child in list(self._children.values()):
+            lines.extend(child.render(self.name))
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("labels", "buckets", "counts", "sum")
+
+    def __init__(self, labels: str, buckets: Tuple[float, ...]) -> None:
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # One per bucket plus +Inf; cumulated when rendered
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name: str) -> List[str]:
+        separator = "," if self.labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{self.labels}{separator}le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{self.labels}{separator}le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{{{self.labels}}} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{{{self.labels}}} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self, labels: str) -> _HistogramChild:
+        return _HistogramChild(labels, self.buckets)
+
+
+class CallbackMetric:
+    """
+    A gauge or counter whose value is read from `callback` when metrics are
+    scraped, for figures the service already keeps (queue depths, cache hits).
+    """
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float], kind: str = "gauge") -> None:
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        sample = f"{self.name}_total" if self.kind == "counter" else self.name
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            f"{sample} {_format_value(self.callback())}",
+        ]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, callback: Callable[[], float], kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, callback, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, by route template and status",
+    ("method", "route", "status"),
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Time spent executing SQL statements, by engine and statement type",
+    ("engine", "statement"),
+    buckets=FAST_BUCKETS,
+)
+db_pool_checkout_duration = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time to check a connection out of the pool, including waiting for a free one",
+    ("engine",),
+    buckets=FAST_BUCKETS,
+)
+blocklist_call_duration = registry.histogram(
+    "blocklist_call_duration_seconds",
+    "Time spent in token blocklist store calls (Redis round-trips with the Redis backend), by call",
+    ("call",),
+    buckets=FAST_BUCKETS,
+)
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "Time spent running bcrypt, by operation",
+    ("operation",),
+    buckets=HASH_BUCKETS,
+)
+
+
+_HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class MetricsMiddleware:
+    """
+    Records every HTTP request in `http_request_duration_seconds`, labelled with
+    the matched route's path template so ids never become label values.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # id(route) -> method -> status -> histogram child; a request only builds
+        # labels the first time its combination is seen. Routes are unhashable
+        # but live as long as the app, so their ids are stable keys.
+        self._children: Dict[int, Dict[str, Dict[int, _HistogramChild]]] = {}
+
+    def _child(self, scope: Scope, status_code: int) -> _HistogramChild:
+        route = id(scope.get("route"))
+        by_method = self._children.get(route)
+        if by_method is None:
+            by_method = self._children[route] = {}
+        # Clients choose the method, so arbitrary ones would grow the label set without bound
+        method = scope["method"] if scope["method"] in _HTTP_METHODS else "OTHER"
+        by_status = by_method.get(method)
+        if by_status is None:
+            by_status = by_method[method] = {}
+        child = by_status.get(status_code)
+        if child is None:
+            child = by_status[status_code] = http_request_duration.labels(
+                method, _route_template(scope), str(status_code)
+            )
+        return child
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self._child(scope, status_code).observe(time.perf_counter() - started)
+
+
+def _route_template(scope: Scope) -> str:
+    """
+    The full path template of the route that handled the request, e.g.
+    `/api/v1/users/{user_id}`. The matched route only knows its path relative
+    to the router it was included in, so the prefix is taken from the request path.
+    """
+    path_format = getattr(scope.get("route"), "path_format", None)
+    if path_format is None:
+        return "unmatched"
+    try:
+        suffix = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    path = scope["path"]
+    if not path.endswith(suffix):
+        return path_format
+    return path[: len(path) - len(suffix)] + path_format
+
+
+_STATEMENT_TYPES = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Times the statements `engine` runs and its pool checkouts under the `engine` label `name`."""
+    by_type = {statement: db_query_duration.labels(name, statement) for statement in _STATEMENT_TYPES}
+    other = db_query_duration.labels(name, "OTHER")
+    checkout = db_pool_checkout_duration.labels(name)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        if started is not None:
+            by_type.get(statement.lstrip()[:6].upper(), other).observe(time.perf_counter() - started)
+
+    # The pool has no event before a checkout starts, so its connect() is wrapped
+    # instead, and wrapped again on the new pool whenever the engine is disposed
+    def time_checkouts(pool) -> None:
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                checkout.observe(time.perf_counter() - started)
+
+        pool.connect = timed_connect
+
+    @event.listens_for(engine.sync_engine, "engine_disposed")
+    def engine_disposed(sync_engine):
+        time_checkouts(sync_engine.pool)
+
+    time_checkouts(engine.sync_engine.pool)
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(default=None)) -> Response:
+    """Every metric in the Prometheus text exposition format. Requires `METRICS_TOKEN` as a bearer token when it is set."""
+    if Config.METRICS_TOKEN is not None and not secrets.compare_digest(
+        (authorization or "").encode(), f"Bearer {Config.METRICS_TOKEN}".encode()
+    ):
+        raise InvalidTokenException("A valid metrics token is required")
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SRC_DIR)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapses whitespace and replaces literals and IN-lists with placeholders, so repeats of one query group together."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _PLACEHOLDER_LIST.sub("(?, ...)", statement)
+
+
+def _call_site() -> Optional[str]:
+    """
+    The innermost application frame (under `src/`, outside this module) that
+    led to the current statement. SQLAlchemy's asyncio layer runs statements in
+    a greenlet whose stack starts inside SQLAlchemy, so the awaiting code is
+    found by continuing into the parent greenlet's stack.
+    """
+    frame = sys._getframe(2)
+    parent = greenlet.getcurrent().parent
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(SRC_DIR) and filename != __file__:
+                return f"{os.path.relpath(filename, PROJECT_DIR)}:{frame.f_lineno} ({frame.f_code.co_name})"
+            frame = frame.f_back
+        if parent is None:
+            return None
+        frame, parent = parent.gr_frame, parent.parent
+
+
+class QueryStats:
+    """The statements one request (or one `assert_max_queries` block) ran and the time they took."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        # Raw statement -> [runs, seconds, call site of the first run]
+        self.statements: Dict[str, list] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, seconds, _call_site()]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def absorb(self, other: "QueryStats") -> None:
+        self.count += other.count
+        self.seconds += other.seconds
+        self.slowest = max(self.slowest, other.slowest)
+        for statement, (runs, seconds, call_site) in other.statements.items():
+            entry = self.statements.setdefault(statement, [0, 0.0, call_site])
+            entry[0] += runs
+            entry[1] += seconds
+
+    def queries(self) -> List[dict]:
+        """One entry per normalized statement, most time-consuming first."""
+        grouped: Dict[str, dict] = {}
+        for statement, (runs, seconds, call_site) in self.statements.items():
+            sql = normalize_sql(statement)
+            entry = grouped.setdefault(sql, {"sql": sql, "count": 0, "total_ms": 0.0, "call_site": call_site})
+            entry["count"] += runs
+            entry["total_ms"] += seconds * 1e3
+        for entry in grouped.values():
+            entry["total_ms"] = round(entry["total_ms"], 3)
+        return sorted(grouped.values(), key=lambda entry: entry["total_ms"], reverse=True)
+
+    def server_timing(self) -> str:
+        queries = "query" if self.count == 1 else "queries"
+        return f'db;desc="{self.count} {queries}";dur={self.seconds * 1e3:.1f}'
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def track_queries(engine: AsyncEngine) -> None:
+    """Records every statement `engine` runs into the `QueryStats` of the request (or block) running it."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_stats.get() is not None:
+            conn.info["budget_query_started"] = time.perf_counter()
+
+    def finished(conn, statement) -> None:
+        started = conn.info.pop("budget_query_started", None)
+        stats = _current_stats.get()
+        if started is not None and stats is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        finished(conn, statement)
+
+    # Statements that raise (e.g. on a unique constraint) never reach after_cursor_execute
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.statement is not None:
+            finished(context.connection, context.statement)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """
+    Collects the statements run inside the block. Blocks nest: statements
+    counted by an inner block (such as a request) are also added to the outer one.
+    """
+    stats = QueryStats()
+    outer = _current_stats.get()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        if outer is not None:
+            outer.absorb(stats)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """
+    Fails with an AssertionError listing the statements run when the block runs
+    more than `limit` of them, e.g. to lock in an endpoint's query count:
+
+        with assert_max_queries(2):
+            await client.get(f"/api/v1/users/{user_id}", headers=headers)
+    """
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        details = "\n".join(
+            f"  {query['count']}x {query['sql']}  [{query['call_site']}]" for query in stats.queries()
+        )
+        raise AssertionError(f"Expected at most {limit} queries, {stats.count} were run:\n{details}")
+
+
+def budget_violations(stats: QueryStats) -> List[str]:
+    """The budgets in Config that `stats` exceeds."""
+    violations = []
+    if stats.count > Config.QUERY_BUDGET_MAX_STATEMENTS:
+        violations.append("statements")
+    if stats.seconds > Config.QUERY_BUDGET_MAX_DB_SECONDS:
+        violations.append("db_time")
+    if stats.slowest > Config.SLOW_QUERY_SECONDS:
+        violations.append("slow_query")
+    if stats.statements and max(runs for runs, _, _ in stats.statements.values()) >= Config.N_PLUS_ONE_THRESHOLD:
+        violations.append("n_plus_one")
+    return violations
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the statements and database time of every request, reports them in
+    a `Server-Timing` header, and logs a report of the queries behind any
+    request that goes over its budgets.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with collect_queries() as stats:
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    # Statements run while a streaming body is sent come later and only reach the report
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                violations = budget_violations(stats)
+                if violations:
+                    self._report(scope, stats, violations, time.perf_counter() - started)
+
+    @staticmethod
+    def _report(scope: Scope, stats: QueryStats, violations: List[str], elapsed: float) -> None:
+        report = {
+            "event": "query_budget_exceeded",
+            "method": scope["method"],
+            "path": scope["path"],
+            "violations": violations,
+            "statements": stats.count,
+            "db_ms": round(stats.seconds * 1e3, 3),
+            "request_ms": round(elapsed * 1e3, 3),
+            "budget": {
+                "max_statements": Config.QUERY_BUDGET_MAX_STATEMENTS,
+                "max_db_ms": Config.QUERY_BUDGET_MAX_DB_SECONDS * 1e3,
+                "slow_query_ms": Config.SLOW_QUERY_SECONDS * 1e3,
+                "n_plus_one_threshold": Config.N_PLUS_ONE_THRESHOLD,
+            },
+            "queries": stats.queries()[:10],
+        }
+        logger.warning(json.dumps(report))
@@ -0,0 +1,15 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    A JSONResponse rendered with orjson, which encodes UUIDs and datetimes
+    natively and is several times faster than the stdlib encoder. It is the
+    app's default response class, so models returned from routes use it too.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping
+
+from sqlalchemy import String, bindparam, insert
+
+from src.config import Config
+from src.database.main import AsyncSessionLocal
+from .models import UserActivityLog
+
+logger = logging.getLogger(__name__)
+
+
+# Bound as text so the timestamp is stored exactly as given, without the
+# microseconds SQLAlchemy's DateTime would append
+_INSERT_EVENT = insert(UserActivityLog).values(performed_at=bindparam("performed_at_text", type_=String))
+
+
+class AuditLogWriter:
+    """
+    Writes `user_activity_logs` rows in batches, off the request path.
+
+    Used when `AUDIT_LOG_MODE` is "queue": the service layer records each user
+    mutation after it commits, and `run` inserts the queued events with one
+    executemany per batch. The queue is bounded, so writers wait once the
+    database falls behind. In "trigger" mode every call is a no-op and the
+    `log_user_*` triggers write the rows instead.
+    """
+
+    def __init__(self, enabled: bool, max_size: int, batch_size: int, flush_interval: float) -> None:
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._batch: List[Dict[str, Any]] = []  # Taken off the queue but not written yet
+
+    async def record(self, user_id: uuid.UUID, action: str, details: Mapping[str, Any]) -> None:
+        if not self.enabled:
+            return
+        await self._queue.put({
+            "user_id": user_id,
+            "action": action,
+            # Stamped now rather than at flush time, as the same UTC text `datetime('now')` gives the triggers
+            "performed_at_text": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "details": json.dumps(details, separators=(",", ":")),  # Compact, like json_object()
+        })
+
+    async def created(self, user_id: uuid.UUID, firstname: str, lastname: str, email: str) -> None:
+        await self.record(user_id, "CREATE", {"firstname": firstname, "lastname": lastname, "email": email})
+
+    async def updated(self, user_id: uuid.UUID, old: Mapping[str, Any], new: Mapping[str, Any]) -> None:
+        details = {}
+        for field in ("firstname", "lastname", "email"):
+            details[f"old_{field}"] = old[field]
+            details[f"new_{field}"] = new[field]
+        if old.get("is_deleted") != new.get("is_deleted"):
+            # The trigger logs soft deletes and restores without saying what changed
+            details["old_is_deleted"] = old["is_deleted"]
+            details["new_is_deleted"] = new["is_deleted"]
+        await self.record(user_id, "UPDATE", details)
+
+    async def deleted(self, user_id: uuid.UUID, firstname: str, lastname: str, email: str) -> None:
+        await self.record(
+            user_id, "DELETE", {"deleted_firstname": firstname, "deleted_lastname": lastname, "deleted_email": email}
+        )
+
+    async def _write(self) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(_INSERT_EVENT, self._batch)
+            await session.commit()
+        self._batch = []
+
+    def _take_available(self) -> None:
+        while len(self._batch) < self.batch_size and not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+
+    async def run(self) -> None:
+        """Background task flushing a batch once it is full or `flush_interval` has passed."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._batch:
+                self._batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+                self._take_available()
+                while len(self._batch) < self.batch_size and loop.time() < deadline:
+                    try:
+                        self._batch.append(await asyncio.wait_for(self._queue.get(), deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        break
+                    self._take_available()
+
+            try:
+                await self._write()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the batch and retry; the bounded queue holds writers back meanwhile
+                logger.warning(f"Could not write {len(self._batch)} audit log events: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self) -> None:
+        """Writes every queued event. Called on shutdown once `run` has been cancelled."""
+        self._take_available()
+        while self._batch:
+            await self._write()
+            self._take_available()
+
+
+audit_log = AuditLogWriter(
+    enabled=Config.AUDIT_LOG_MODE == "queue",
+    max_size=Config.AUDIT_QUEUE_MAX_SIZE,
+    batch_size=Config.AUDIT_FLUSH_BATCH_SIZE,
+    flush_interval=Config.AUDIT_FLUSH_INTERVAL_SECONDS,
+)
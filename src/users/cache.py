@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.config import Config
+from src.metrics import registry
+from src.database.redis import (
+    USER_INVALIDATION_CHANNEL,
+    publish_user_invalidation,
+    publish_user_invalidations,
+    redis_client,
+)
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+class AuthenticatedUserCache:
+    """
+    A bounded, TTL-limited LRU of the users resolved from access/refresh tokens.
+
+    Entries are column snapshots rather than live ORM objects, so every hit
+    hands out a fresh detached `User` that no two requests share. Writes go
+    through `invalidate`, which drops that one user and records when it did,
+    so a lookup that raced with the write cannot put the stale row back.
+    `clear` bumps an epoch that turns away every lookup begun before it.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.epoch = 0
+        self.generation = 0  # Counts per-user invalidations
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._emails_by_id: Dict[uuid.UUID, str] = {}
+        # User id -> generation of its latest invalidation, oldest first. Only
+        # lookups in flight need it, so it is trimmed to `max_size` and lookups
+        # begun before the newest trimmed entry (`_horizon`) are turned away.
+        self._invalidated_at: "OrderedDict[uuid.UUID, int]" = OrderedDict()
+        self._horizon = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, email: str) -> Optional[User]:
+        entry = self._entries.get(email)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            self._evict(email)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(email)
+        self.hits += 1
+        return User(**snapshot)
+
+    def snapshot(self) -> Tuple[int, int]:
+        """Taken before loading a user; `put` refuses the row if it may have gone stale since."""
+        return self.epoch, self.generation
+
+    def put(self, user: User, snapshot: Tuple[int, int]) -> None:
+        """Caches `user` unless it (or the whole cache) was invalidated since `snapshot`."""
+        epoch, generation = snapshot
+        if (
+            not self.enabled
+            or epoch != self.epoch
+            or generation < self._horizon
+            or self._invalidated_at.get(user.id, -1) > generation
+        ):
+            return
+
+        snapshot = {column.name: getattr(user, column.name) for column in User.__table__.columns}
+        self._evict(user.email)
+        self._entries[user.email] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._emails_by_id[user.id] = user.email
+
+        while len(self._entries) > self.max_size:
+            _, (_, oldest) = self._entries.popitem(last=False)
+            self._emails_by_id.pop(oldest["id"], None)
+
+    def invalidate_local(self, user_id: uuid.UUID) -> None:
+        self.generation += 1
+        self._invalidated_at.pop(user_id, None)
+        self._invalidated_at[user_id] = self.generation
+        while len(self._invalidated_at) > max(self.max_size, 1):
+            _, self._horizon = self._invalidated_at.popitem(last=False)
+        email = self._emails_by_id.pop(user_id, None)
+        if email is not None:
+            self._entries.pop(email, None)
+
+    async def invalidate(self, user_id: uuid.UUID) -> None:
+        """Drops a user from this worker's cache and, if enabled, from every other worker's."""
+        self.invalidate_local(user_id)
+        if Config.USER_CACHE_SHARED_INVALIDATION:
+            try:
+                await publish_user_invalidation(user_id.hex)
+            except Exception as e:
+                logger.warning(f"Could not publish user cache invalidation for {user_id}: {e}")
+
+    async def invalidate_many(self, user_ids: Sequence[uuid.UUID]) -> None:
+        """`invalidate` for several users, published in one round-trip."""
+        for user_id in user_ids:
+            self.invalidate_local(user_id)
+        if Config.USER_CACHE_SHARED_INVALIDATION and user_ids:
+            try:
+                await publish_user_invalidations([user_id.hex for user_id in user_ids])
+            except Exception as e:
+                logger.warning(f"Could not publish user cache invalidations for {len(user_ids)} users: {e}")
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self._emails_by_id.clear()
+        self._invalidated_at.clear()
+
+    def _evict(self, email: str) -> None:
+        entry = self._entries.pop(email, None)
+        if entry is not None:
+            self._emails_by_id.pop(entry[1]["id"], None)
+
+
+user_cache = AuthenticatedUserCache(
+    max_size=Config.USER_CACHE_MAX_SIZE,
+    ttl_seconds=Config.USER_CACHE_TTL_SECONDS,
+)
+registry.callback("user_cache_hits", "Token lookups answered by the authenticated-user cache", lambda: user_cache.hits, kind="counter")
+registry.callback("user_cache_misses", "Token lookups that had to load the user", lambda: user_cache.misses, kind="counter")
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Background task that applies invalidations published by other workers.
+    The whole local cache is dropped whenever the subscription is (re)established,
+    because messages sent while disconnected are lost.
+    """
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(USER_INVALIDATION_CHANNEL)
+            user_cache.clear()
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    user_cache.invalidate_local(uuid.UUID(hex=message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"User cache invalidation listener disconnected: {e}")
+            user_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.reset()
@@ -1,6 +1,7 @@
-from typing import Any, Callable
+from typing import Any, Callable, Optional
+from sqlalchemy.exc import IntegrityError
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from src.responses import FastJSONResponse
 from fastapi import FastAPI, status
 
 class UserException(Exception):
@@ -33,10 +34,43 @@ class UserNotDeletedException(UserException):
     pass
 
 
+class InvalidCursorException(UserException):
+    """Raised when a pagination cursor cannot be decoded or cursors are combined."""
+    pass
+
+
+class PreconditionFailedException(UserException):
+    """Raised when an `If-Match` precondition does not match the user's current version."""
+    pass
+
+
+class InvalidFieldsException(UserException):
+    """Raised when a `fields` parameter is empty or names a field that does not exist."""
+    pass
+
+
+def conflict_from_integrity_error(
+    error: IntegrityError,
+    username_message: str = "Username already registered",
+    email_message: str = "Email already registered",
+) -> Optional[UserException]:
+    """
+    Maps a unique-constraint violation on `users.username`/`users.email` to the
+    matching conflict exception, or returns None for any other integrity error.
+    """
+    message = str(error.orig)
+    if "UNIQUE" not in message.upper():
+        return None
+    if "username" in message:
+        return UsernameConflictException(username_message)
+    if "email" in message:
+        return EmailConflictException(email_message)
+    return None
+
 
 def create_exception_handler(
     status_code: int, error_type: str, error_code: str
-) -> Callable[[Request, Exception], JSONResponse]:
+) -> Callable[[Request, Exception], FastJSONResponse]:
     """
     Factory function to create a FastAPI exception handler that returns a
     Stripe-like error response.
@@ -45,7 +79,7 @@ def create_exception_handler(
         """
         Handles the exception and returns a structured JSON response.
         """
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status_code,
             content={
                 "error": {
@@ -101,4 +135,28 @@ def register_user_errors(app: FastAPI):
             error_type="invalid_request_error",
             error_code="user_not_deleted",
         ),
-    )
\ No newline at end of file
+    )
+    app.add_exception_handler(
+        InvalidCursorException,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            error_type="invalid_request_error",
+            error_code="invalid_cursor",
+        ),
+    )
+    app.add_exception_handler(
+        PreconditionFailedException,
+        create_exception_handler(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            error_type="invalid_request_error",
+            error_code="precondition_failed",
+        ),
+    )
+    app.add_exception_handler(
+        InvalidFieldsException,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            error_type="invalid_request_error",
+            error_code="invalid_fields",
+        ),
+    )
@@ -0,0 +1,37 @@
+import uuid
+from typing import List, Optional
+
+from .models import User
+
+
+def user_etag(user: User) -> str:
+    """A strong ETag for one version of a user: `"<id hex>-<version>"`."""
+    return f'"{user.id.hex}-{user.version}"'
+
+
+def _parse(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Whether an `If-None-Match` header matches `etag`, i.e. a 304 can be sent (weak comparison)."""
+    if header is None:
+        return False
+    tags = _parse(header)
+    return "*" in tags or etag in [tag.removeprefix("W/") for tag in tags]
+
+
+def if_match_versions(header: str, user_id: uuid.UUID) -> Optional[List[int]]:
+    """
+    The user versions an `If-Match` header accepts, or None for `*` (any).
+    Weak tags never match, and tags for other users are ignored.
+    """
+    tags = _parse(header)
+    if "*" in tags:
+        return None
+    versions = []
+    prefix = f'"{user_id.hex}-'
+    for tag in tags:
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            versions.append(int(tag[len(prefix):-1]))
+    return versions
@@ -1,12 +1,16 @@
 from sqlmodel import SQLModel, Field, Column,func
 import sqlalchemy.dialects.sqlite as s
-from sqlalchemy import String, DateTime
+from sqlalchemy import String, DateTime, Index, Integer
 import uuid
 from datetime import datetime
 
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        # Backs keyset pagination of non-deleted users ordered by (created_at, id)
+        Index("ix_users_is_deleted_created_at_id", "is_deleted", "created_at", "id"),
+    )
 
     id: uuid.UUID | None = Field(
         default_factory=uuid.uuid4,
@@ -46,11 +50,26 @@ class User(SQLModel, table=True):
             server_default=func.now(),
             nullable=False)
     )
+    # Bumped by every write; exposed as the user's ETag
+    version: int = Field(
+        default=1,
+        sa_column=Column(Integer, nullable=False, server_default="1")
+    )
+    # Set when the user is soft-deleted, so old deletions can be purged in bulk
+    deleted_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
 
 
 
 class UserActivityLog(SQLModel, table=True):
     __tablename__ = "user_activity_logs"
+    __table_args__ = (
+        # Back the per-user activity endpoint and the global feed, both newest first
+        Index("ix_user_activity_logs_user_id_performed_at", "user_id", "performed_at"),
+        Index("ix_user_activity_logs_performed_at", "performed_at"),
+    )
     id: int | None = Field(default=None, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="users.id")
     action: str
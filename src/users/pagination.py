@@ -0,0 +1,73 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from .errors import InvalidCursorException
+
+
+def _pack(key: List[Any]) -> str:
+    raw = json.dumps(key, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _unpack(cursor: str) -> List[Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at: datetime, user_id: uuid.UUID) -> str:
+    """
+    Builds an opaque keyset cursor from a row's `(created_at, id)` sort key.
+
+    The timestamp is kept in the same text form SQLite stores it in
+    (`CURRENT_TIMESTAMP` has no fractional part), so the cursor can be compared
+    directly against the indexed column without any SQL function wrapping it.
+    """
+    return _pack([created_at.isoformat(sep=" "), user_id.hex])
+
+
+def decode_cursor(cursor: str) -> Tuple[str, uuid.UUID]:
+    """Decodes a cursor produced by `encode_cursor` into its `(created_at, id)` key."""
+    try:
+        created_at, user_id = _unpack(cursor)
+        datetime.fromisoformat(created_at)  # Reject anything that is not a timestamp
+        return created_at, uuid.UUID(hex=user_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorException("Invalid pagination cursor")
+
+
+def encode_search_cursor(rank: float, user_id: uuid.UUID) -> str:
+    """Builds an opaque cursor from a search hit's `(rank, id)` sort key."""
+    return _pack([rank, user_id.hex])  # JSON floats round-trip exactly
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, uuid.UUID]:
+    """Decodes a cursor produced by `encode_search_cursor` into its `(rank, id)` key."""
+    try:
+        rank, user_id = _unpack(cursor)
+        return float(rank), uuid.UUID(hex=user_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorException("Invalid pagination cursor")
+
+
+def encode_activity_cursor(performed_at: datetime, log_id: int) -> str:
+    """
+    Builds an opaque cursor from an activity log row's `(performed_at, id)` sort
+    key, with the timestamp in its stored text form like `encode_cursor`.
+    """
+    return _pack([performed_at.isoformat(sep=" "), log_id])
+
+
+def decode_activity_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodes a cursor produced by `encode_activity_cursor` into its `(performed_at, id)` key."""
+    try:
+        performed_at, log_id = _unpack(cursor)
+        datetime.fromisoformat(performed_at)
+        if not isinstance(log_id, int):
+            raise TypeError(log_id)
+        return performed_at, log_id
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorException("Invalid pagination cursor")
@@ -0,0 +1,81 @@
+import asyncio
+import gzip
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, select
+
+from src.config import Config
+from src.database.main import AsyncSessionLocal
+from .models import UserActivityLog
+from .streaming import to_ndjson
+
+logger = logging.getLogger(__name__)
+
+
+def _append_to_archive(directory: str, rows: List[Dict[str, Any]]) -> None:
+    by_month: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        by_month[row["performed_at"].strftime("%Y-%m")].append(row)
+
+    os.makedirs(directory, exist_ok=True)
+    for month, month_rows in by_month.items():
+        # Each chunk is appended as a complete gzip member; zcat and gzip.open
+        # read consecutive members as one stream
+        path = os.path.join(directory, f"user_activity_logs-{month}.ndjson.gz")
+        with open(path, "ab") as archive:
+            archive.write(gzip.compress(to_ndjson(month_rows)))
+            archive.flush()
+            os.fsync(archive.fileno())
+
+
+async def archive_activity_logs(
+    older_than: datetime,
+    directory: str = Config.ACTIVITY_ARCHIVE_DIR,
+    chunk_size: int = Config.ACTIVITY_ARCHIVE_CHUNK_SIZE,
+) -> int:
+    """
+    Moves activity log rows performed before `older_than` into the monthly
+    archive files, one chunk per transaction, and returns how many were moved.
+
+    Each chunk is claimed with a single `DELETE ... RETURNING`, written and
+    synced to its archive file, and only then committed. Concurrent runs never
+    archive the same row twice; a crash before the commit can at worst leave a
+    chunk in both the archive and the table.
+    """
+    oldest = (
+        select(UserActivityLog.id)
+        .where(UserActivityLog.performed_at < older_than)
+        .order_by(UserActivityLog.performed_at)
+        .limit(chunk_size)
+    )
+    stmt = delete(UserActivityLog).where(UserActivityLog.id.in_(oldest)).returning(*UserActivityLog.__table__.columns)
+
+    moved = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            rows = [dict(row) for row in (await session.execute(stmt)).mappings()]
+            if not rows:
+                return moved
+            rows.sort(key=lambda row: row["id"])
+            await asyncio.to_thread(_append_to_archive, directory, rows)
+            await session.commit()
+        moved += len(rows)
+
+
+async def run_activity_retention() -> None:
+    """Background task archiving activity older than `ACTIVITY_RETENTION_DAYS` every interval."""
+    while True:
+        try:
+            cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=Config.ACTIVITY_RETENTION_DAYS)
+            moved = await archive_activity_logs(cutoff)
+            if moved:
+                logger.info(f"Archived {moved} activity log rows older than {cutoff}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not archive activity logs: {e}")
+        await asyncio.sleep(Config.ACTIVITY_RETENTION_INTERVAL_SECONDS)
@@ -1,13 +1,24 @@
-from typing import List
+from datetime import datetime
+from typing import Any, List, Literal, Optional
+import json
+import tempfile
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import status, Response, APIRouter, Depends, Request
-from src.database.main import get_session
-from src.users.models import User
+from fastapi import status, Response, APIRouter, Depends, Request, Query, Header
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from src.config import Config
+from src.responses import FastJSONResponse
+from src.database.main import get_session, get_read_session, AsyncSessionLocal, ReadSessionLocal
+from src.users.models import User, UserActivityLog
 from src.auth.schemas import UserUpdateSchema
-from src.users.schemas import PaginatedResponse
-from src.users.services import UserService
-from src.auth.dependencies import get_current_user
+from src.users.schemas import PaginatedResponse, UserBatchLookupSchema, UserBatchResponse, BulkUserSelectionSchema
+from src.users.etags import user_etag, if_none_match, if_match_versions
+from src.users.pagination import encode_cursor, encode_search_cursor, encode_activity_cursor
+from src.users.streaming import iter_csv_records, iter_ndjson_records, encode_csv, encode_ndjson, gzip_chunks
+from src.users.serializers import serialize_user, serialize_row, serialize_activity_log, serialize_page, parse_fields, narrow, USER_FIELDS
+from src.users.services import UserService, BulkAction, USER_EXPORT_COLUMNS, ACTIVITY_EXPORT_COLUMNS
+from src.auth.dependencies import get_current_user, require_authentication
 from src.auth.dependencies import RoleChecker
 
 
@@ -17,37 +28,332 @@ user_service = UserService()
 # Dependency for admin-only access
 admin_only = Depends(RoleChecker(allowed_roles=["admin"]))
 
+def requested_fields(
+    fields: Optional[str] = Query(
+        default=None,
+        description=f"Comma-separated fields to return, out of: {', '.join(USER_FIELDS)}",
+    ),
+) -> Optional[List[str]]:
+    return parse_fields(fields)
+
+
+def _user_response(user: Any, if_none_match_header: Optional[str] = None, fields: Optional[List[str]] = None) -> Response:
+    """
+    Serializes `user` (a model or a column row) narrowed to `fields`, with its
+    ETag, or answers 304 without building a body if the client's copy is current.
+    """
+    etag = user_etag(user)
+    if if_none_match(if_none_match_header, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    data = serialize_user(user) if isinstance(user, User) else serialize_row(user)
+    return FastJSONResponse(narrow(data, fields), headers={"ETag": etag})
+
+
 @user_router.get("/me", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    """Get the current logged-in user's details."""
-    return current_user
+async def read_users_me(
+    current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(default=None),
+    fields: Optional[List[str]] = Depends(requested_fields),
+) -> Response:
+    """
+    Get the current logged-in user's details, or only `fields` of them.
+    Supports `If-None-Match` with the returned `ETag`.
+    """
+    return _user_response(current_user, if_none_match, fields)
 
 
 @user_router.get("/all", response_model=PaginatedResponse[User], dependencies=[admin_only])
 async def get_all_users(
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    skip: int = Query(default=0, ge=0, deprecated=True),
+    limit: int = Query(default=10, ge=1, le=100),
+    starting_after: Optional[str] = None,
+    ending_before: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(requested_fields),
+) -> FastJSONResponse:
+    """
+    Returns a paginated list of non-deleted users, optionally with only `fields` of each.
+    Use the `next_cursor`/`previous_cursor` of a page as `starting_after`/`ending_before`
+    to move through the list; `skip` is deprecated and ignored when a cursor is given.
+    """
+    users, has_more = await user_service.get_all_users(
+        session=session,
+        skip=skip,
+        limit=limit,
+        starting_after=starting_after,
+        ending_before=ending_before,
+        rows=True,
+        fields=fields,
+    )
+    # Column rows are encoded straight to JSON; response_model only documents the shape
+    return FastJSONResponse(serialize_page(
+        users,
+        serialize_row,
+        has_more=has_more,
+        url=str(request.url),
+        next_cursor=encode_cursor(users[-1].created_at, users[-1].id) if users else None,
+        previous_cursor=encode_cursor(users[0].created_at, users[0].id) if users else None,
+        fields=fields,
+    ))
+
+
+@user_router.get("/search", response_model=PaginatedResponse[User], dependencies=[admin_only])
+async def search_users(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200),
+    session: AsyncSession = Depends(get_read_session),
+    limit: int = Query(default=10, ge=1, le=100),
+    starting_after: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(requested_fields),
+) -> FastJSONResponse:
+    """
+    Search non-deleted users by name, username or email, best match first.
+    Every term in `q` must match, and matches as a prefix (`jo sm` finds John Smith).
+    Pass `next_cursor` as `starting_after` to fetch the next page.
+    """
+    hits, has_more = await user_service.search_users(
+        q=q, session=session, limit=limit, starting_after=starting_after, fields=fields
+    )
+    return FastJSONResponse(serialize_page(
+        hits,
+        serialize_row,
+        has_more=has_more,
+        url=str(request.url),
+        next_cursor=encode_search_cursor(hits[-1].rank, hits[-1].id) if hits else None,
+        fields=fields or USER_FIELDS,  # Drops the rank column
+    ))
+
+
+@user_router.post("/batch", response_model=UserBatchResponse, dependencies=[Depends(require_authentication)])
+async def get_users_batch(
+    lookup: UserBatchLookupSchema,
+    session: AsyncSession = Depends(get_read_session),
+    fields: Optional[List[str]] = Depends(requested_fields),
+) -> FastJSONResponse:
+    """
+    Resolve up to 500 user ids in one request, optionally with only `fields` of each;
+    unknown or deleted ids are listed in `missing`.
+    """
+    users, missing = await user_service.get_users_by_ids(user_ids=lookup.ids, session=session, fields=fields)
+    data = [narrow(serialize_row(user), fields) for user in users]
+    return FastJSONResponse({"object": "list", "data": data, "missing": missing})
+
+
+@user_router.post("/import", dependencies=[admin_only])
+async def import_users(
     request: Request,
     session: AsyncSession = Depends(get_session),
-    skip: int = 0,
-    limit: int = 10,
-) -> PaginatedResponse[User]:
-    """Returns a paginated list of non-deleted users."""
-    users, has_more = await user_service.get_all_users(session=session, skip=skip, limit=limit)
-    return PaginatedResponse(data=users, has_more=has_more, url=str(request.url))
+    batch_size: int = Query(default=Config.BULK_IMPORT_BATCH_SIZE, ge=1, le=5000),
+) -> StreamingResponse:
+    """
+    Bulk-create users from an NDJSON (default) or CSV (`Content-Type: text/csv`) body.
+    The upload is processed as it streams in and the response is an NDJSON report
+    with one result per input row followed by a summary line.
+    """
+    if "csv" in request.headers.get("content-type", ""):
+        records = iter_csv_records(request.stream())
+    else:
+        records = iter_ndjson_records(request.stream())
+
+    # Results are spooled (to disk past 1 MiB) so the report never has to fit in memory
+    report = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    created = failed = 0
+    async for result in user_service.import_users(records=records, session=session, batch_size=batch_size):
+        if result["status"] == "created":
+            created += 1
+        else:
+            failed += 1
+        report.write(json.dumps(result).encode() + b"\n")
+    report.write(json.dumps({"object": "import_summary", "created": created, "failed": failed}).encode() + b"\n")
+    report.seek(0)
+
+    return StreamingResponse(
+        iter(lambda: report.read(64 * 1024), b""),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(report.close),
+    )
+
+
+def _bulk_response(action: BulkAction, selection: BulkUserSelectionSchema, chunk_size: int) -> StreamingResponse:
+    async def progress():
+        # Chunks keep committing while the report streams, so the work needs its own session
+        async with AsyncSessionLocal() as session:
+            async for record in user_service.bulk_action(
+                action=action, selection=selection, session=session, chunk_size=chunk_size
+            ):
+                yield json.dumps(record).encode() + b"\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
+@user_router.post("/bulk/soft-delete", dependencies=[admin_only])
+async def bulk_soft_delete_users(
+    selection: BulkUserSelectionSchema,
+    chunk_size: int = Query(default=Config.BULK_ACTION_CHUNK_SIZE, ge=1, le=5000),
+) -> StreamingResponse:
+    """
+    Soft delete every selected user, one chunk per statement and commit. The
+    response is NDJSON with a progress line per chunk followed by a summary line.
+    """
+    return _bulk_response("soft_delete", selection, chunk_size)
+
 
+@user_router.post("/bulk/restore", dependencies=[admin_only])
+async def bulk_restore_users(
+    selection: BulkUserSelectionSchema,
+    chunk_size: int = Query(default=Config.BULK_ACTION_CHUNK_SIZE, ge=1, le=5000),
+) -> StreamingResponse:
+    """Restore every selected soft-deleted user, reporting progress like `/bulk/soft-delete`."""
+    return _bulk_response("restore", selection, chunk_size)
 
-@user_router.get("/{user_id}", response_model=User, dependencies=[Depends(get_current_user)])
-async def get_user_by_id(user_id: uuid.UUID, session: AsyncSession = Depends(get_session)) -> User:
-    """Get a single non-deleted user by id."""
-    return await user_service.get_user_by_id(user_id=user_id, session=session)
 
+@user_router.post("/bulk/hard-delete", dependencies=[admin_only])
+async def bulk_hard_delete_users(
+    selection: BulkUserSelectionSchema,
+    chunk_size: int = Query(default=Config.BULK_ACTION_CHUNK_SIZE, ge=1, le=5000),
+) -> StreamingResponse:
+    """
+    Permanently delete every selected user, reporting progress like `/bulk/soft-delete`.
+    Combine with `deleted_older_than_days` to purge old soft-deleted accounts.
+    """
+    return _bulk_response("hard_delete", selection, chunk_size)
 
-@user_router.patch("/{user_id}", response_model=User, dependencies=[Depends(get_current_user)])
-async def update_part_of_a_user(user_id: uuid.UUID, user_data: UserUpdateSchema, session: AsyncSession = Depends(get_session)) -> User:
-    """Partially update a user's details."""
-    return await user_service.update_part_of_a_user(user_id=user_id, user_data=user_data, session=session)
+
+def _export_response(batches, columns, name: str, format: str, gzip: bool) -> StreamingResponse:
+    chunks = encode_csv(batches, columns) if format == "csv" else encode_ndjson(batches)
+    filename = f"{name}.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@user_router.get("/export", dependencies=[admin_only])
+async def export_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    created_after: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+    include_deleted: bool = False,
+) -> StreamingResponse:
+    """
+    Stream every user as NDJSON or CSV, optionally gzipped. `created_after` and
+    `updated_after` restrict the export to rows changed since a previous run.
+    """
+    async def batches():
+        # The response outlives the request's dependencies, so it needs its own session
+        async with ReadSessionLocal() as session:
+            async for batch in user_service.stream_users(
+                session=session,
+                created_after=created_after,
+                updated_after=updated_after,
+                include_deleted=include_deleted,
+            ):
+                yield batch
+
+    return _export_response(batches(), USER_EXPORT_COLUMNS, "users", format, gzip)
+
+
+def _activity_page(request: Request, logs: List[UserActivityLog], has_more: bool) -> FastJSONResponse:
+    return FastJSONResponse(serialize_page(
+        logs,
+        serialize_activity_log,
+        has_more=has_more,
+        url=str(request.url),
+        next_cursor=encode_activity_cursor(logs[-1].performed_at, logs[-1].id) if logs else None,
+    ))
+
+
+@user_router.get("/activity", response_model=PaginatedResponse[UserActivityLog], dependencies=[admin_only])
+async def get_activity_feed(
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    limit: int = Query(default=20, ge=1, le=100),
+    starting_after: Optional[str] = None,
+) -> FastJSONResponse:
+    """
+    Returns the activity of all users, newest first.
+    Pass `next_cursor` as `starting_after` to fetch the next (older) page.
+    """
+    logs, has_more = await user_service.get_activity_logs(
+        session=session, limit=limit, starting_after=starting_after
+    )
+    return _activity_page(request, logs, has_more)
+
+
+@user_router.get("/activity/export", dependencies=[admin_only])
+async def export_activity_logs(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    performed_after: Optional[datetime] = None,
+) -> StreamingResponse:
+    """Stream the user activity log as NDJSON or CSV, optionally gzipped."""
+    async def batches():
+        async with ReadSessionLocal() as session:
+            async for batch in user_service.stream_activity_logs(session=session, performed_after=performed_after):
+                yield batch
+
+    return _export_response(batches(), ACTIVITY_EXPORT_COLUMNS, "user_activity_logs", format, gzip)
+
+
+@user_router.get("/{user_id}/activity", response_model=PaginatedResponse[UserActivityLog], dependencies=[admin_only])
+async def get_user_activity(
+    user_id: uuid.UUID,
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    limit: int = Query(default=20, ge=1, le=100),
+    starting_after: Optional[str] = None,
+) -> FastJSONResponse:
+    """Returns one user's activity, newest first, paginated like `/activity`. Deleted users keep their history."""
+    logs, has_more = await user_service.get_activity_logs(
+        session=session, user_id=user_id, limit=limit, starting_after=starting_after
+    )
+    return _activity_page(request, logs, has_more)
+
+
+@user_router.get("/{user_id}", response_model=User, dependencies=[Depends(require_authentication)])
+async def get_user_by_id(
+    user_id: uuid.UUID,
+    session: AsyncSession = Depends(get_read_session),
+    if_none_match: Optional[str] = Header(default=None),
+    fields: Optional[List[str]] = Depends(requested_fields),
+) -> Response:
+    """
+    Get a single non-deleted user by id. With `fields` only those columns are read and returned.
+    Supports `If-None-Match` with the returned `ETag`.
+    """
+    user = await user_service.get_user_by_id(user_id=user_id, session=session, fields=fields)
+    return _user_response(user, if_none_match, fields)
+
+
+@user_router.patch("/{user_id}", response_model=User, dependencies=[Depends(require_authentication)])
+async def update_part_of_a_user(
+    user_id: uuid.UUID,
+    user_data: UserUpdateSchema,
+    session: AsyncSession = Depends(get_session),
+    if_match: Optional[str] = Header(default=None),
+) -> Response:
+    """
+    Partially update a user's details. Send the `ETag` from a previous read as
+    `If-Match` to fail with 412 instead of overwriting someone else's change.
+    """
+    user = await user_service.update_part_of_a_user(
+        user_id=user_id,
+        user_data=user_data,
+        session=session,
+        expected_versions=if_match_versions(if_match, user_id) if if_match is not None else None,
+    )
+    return _user_response(user)
 
 
-@user_router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_current_user)])
+@user_router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_authentication)])
 async def soft_delete_user(user_id: uuid.UUID, session: AsyncSession = Depends(get_session)):
     """Soft delete a user by setting the is_deleted flag to true."""
     await user_service.soft_delete_user(user_id=user_id, session=session)
@@ -61,6 +367,6 @@ async def hard_delete_user(user_id: uuid.UUID, session: AsyncSession = Depends(g
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @user_router.patch("/{user_id}/restore", response_model=User, dependencies=[admin_only])
-async def restore_user(user_id: uuid.UUID, session: AsyncSession = Depends(get_session)) -> User:
+async def restore_user(user_id: uuid.UUID, session: AsyncSession = Depends(get_session)) -> Response:
     """Restore a soft-deleted user by setting is_deleted to false."""
-    return await user_service.restore_user(user_id=user_id, session=session)
\ No newline at end of file
+    return _user_response(await user_service.restore_user(user_id=user_id, session=session))
\ No newline at end of file
@@ -1,5 +1,9 @@
-from pydantic import BaseModel
-from typing import List, TypeVar, Generic
+import uuid
+from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import List, Literal, Optional, TypeVar, Generic
+
+from .models import User
 
 T = TypeVar('T')
 
@@ -9,4 +13,71 @@ class PaginatedResponse(BaseModel, Generic[T]):
     object: str = "list"
     data: List[T]
     has_more: bool
-    url: str
\ No newline at end of file
+    url: str
+    next_cursor: Optional[str] = None  # Pass as `starting_after` to fetch the next (older) page
+    previous_cursor: Optional[str] = None  # Pass as `ending_before` to fetch the previous (newer) page
+
+
+MAX_BATCH_LOOKUP_IDS = 500
+
+
+class UserBatchLookupSchema(BaseModel):
+    """Request body for resolving many users at once."""
+    ids: List[uuid.UUID] = Field(min_length=1, max_length=MAX_BATCH_LOOKUP_IDS)
+
+
+class UserBatchResponse(BaseModel):
+    """Users found for a batch lookup, in request order, plus the ids that were not."""
+    object: str = "list"
+    data: List[User]
+    missing: List[uuid.UUID]
+
+
+MAX_BULK_ACTION_IDS = 10_000
+
+
+class BulkUserSelectionSchema(BaseModel):
+    """
+    Selects the users a bulk admin action applies to: explicit `ids`, a filter,
+    or both (the criteria are combined with AND). At least one is required.
+    """
+    ids: Optional[List[uuid.UUID]] = Field(default=None, min_length=1, max_length=MAX_BULK_ACTION_IDS)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    # Only users that were soft-deleted at least this many days ago
+    deleted_older_than_days: Optional[int] = Field(default=None, ge=0)
+
+    @model_validator(mode="after")
+    def has_criteria(self):
+        filters = (self.created_after, self.created_before, self.deleted_older_than_days)
+        if self.ids is None and all(value is None for value in filters):
+            raise ValueError("Provide ids or at least one filter")
+        return self
+
+
+class UserImportSchema(BaseModel):
+    """One row of a bulk user import. Exactly one of `password` or a bcrypt `hashed_password` is required."""
+    firstname: str
+    lastname: str
+    email: EmailStr
+    username: str
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    role: Literal["user", "admin"] = "user"
+
+    @field_validator("password", "hashed_password", mode="before")
+    @classmethod
+    def empty_as_missing(cls, value):
+        # CSV has no null, only empty cells
+        return value or None
+
+    @field_validator("role", mode="before")
+    @classmethod
+    def empty_role_as_default(cls, value):
+        return value or "user"
+
+    @model_validator(mode="after")
+    def one_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("Provide exactly one of password or hashed_password")
+        return self
@@ -0,0 +1,86 @@
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import Row
+from sqlmodel import SQLModel
+
+from .errors import InvalidFieldsException
+from .models import User, UserActivityLog
+
+
+def compile_serializer(model: type[SQLModel]) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Builds a function turning a `model` row into the dict FastAPI would send for
+    it (same fields, order and exclusions), without validating it again.
+    """
+    fields = [name for name, field in model.model_fields.items() if not field.exclude]
+    # Loaded column values sit in the instance __dict__; reading them there skips
+    # the ORM's attribute instrumentation, which dominates the cost otherwise
+    read_loaded = itemgetter(*fields)
+    read_attributes = attrgetter(*fields)
+
+    def serialize(obj: Any) -> Dict[str, Any]:
+        try:
+            values = read_loaded(obj.__dict__)
+        except KeyError:
+            values = read_attributes(obj)  # Expired or unloaded columns load through the ORM
+        return dict(zip(fields, values))
+
+    return serialize
+
+
+def serialize_row(row: Row) -> Dict[str, Any]:
+    """A Core result row as a dict keyed by column name."""
+    return row._asdict()
+
+
+serialize_user = compile_serializer(User)
+serialize_activity_log = compile_serializer(UserActivityLog)
+
+# Fields a client may ask for with `fields=`, in response order
+USER_FIELDS = [name for name, field in User.model_fields.items() if not field.exclude]
+
+
+def parse_fields(value: Optional[str], allowed: Sequence[str] = USER_FIELDS) -> Optional[List[str]]:
+    """
+    Parses a comma-separated `fields` parameter into the requested field names,
+    in `allowed` order. Returns None (every field) when the parameter is absent.
+    """
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if not requested:
+        raise InvalidFieldsException("fields must name at least one field")
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise InvalidFieldsException(
+            f"Unknown fields: {', '.join(sorted(unknown))}. Valid fields are: {', '.join(allowed)}"
+        )
+    return [name for name in allowed if name in requested]
+
+
+def narrow(data: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keeps only `fields` of a serialized object, or all of it when `fields` is None."""
+    if fields is None:
+        return data
+    return {name: data[name] for name in fields}
+
+
+def serialize_page(
+    rows: Iterable[Any],
+    serialize: Callable[[Any], Dict[str, Any]],
+    has_more: bool,
+    url: str,
+    next_cursor: Optional[str] = None,
+    previous_cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """The body of a `PaginatedResponse`, built directly from rows and narrowed to `fields`."""
+    return {
+        "object": "list",
+        "data": [narrow(serialize(row), fields) for row in rows],
+        "has_more": has_more,
+        "url": url,
+        "next_cursor": next_cursor,
+        "previous_cursor": previous_cursor,
+    }
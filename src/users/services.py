@@ -1,97 +1,614 @@
 # Define all crud behaviours with proper status codes and error handling
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete, or_
+from sqlalchemy import Row, update, delete, func, or_, tuple_, literal, literal_column, column, table, text, Float, String
+from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
 from ..auth.schemas import UserUpdateSchema
-from .models import User
+from ..auth.utils import generate_passwd_hash_async, passwd_context, password_hash_pool
+from .models import User, UserActivityLog
+from .schemas import BulkUserSelectionSchema, UserImportSchema
+import re
 import uuid
 from fastapi import HTTPException, status
-from typing import List, Tuple
-from .errors import UserNotFoundException, UsernameConflictException, EmailConflictException, UserNotDeletedException
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Sequence, Tuple
+from .errors import UserNotFoundException, UsernameConflictException, UserNotDeletedException, InvalidCursorException, PreconditionFailedException, conflict_from_integrity_error
+from .pagination import decode_cursor, decode_search_cursor, decode_activity_cursor
+from .cache import user_cache
+from .audit import audit_log
+from src.database.blocklist import BlocklistUnavailableError
+from src.database.redis import bump_user_version, bump_user_versions
+
+BulkAction = Literal["soft_delete", "restore", "hard_delete"]
+
+# The FTS5 index created in init_db; `rank` is its bm25 score (lower is better)
+users_fts = table("users_fts", column("rowid"), column("rank", Float))
+_FTS_TOKEN = re.compile(r"\w")  # Terms without a word character produce no tokens
+# What the activity log records about a user
+AUDIT_COLUMNS = (User.id, User.firstname, User.lastname, User.email, User.is_deleted)
 
 class UserService:
-    async def get_all_users(self, session: AsyncSession, skip: int = 0, limit: int = 100) -> Tuple[List[User], bool]:
+    async def get_all_users(
+        self,
+        session: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        starting_after: Optional[str] = None,
+        ending_before: Optional[str] = None,
+        rows: bool = False,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Any], bool]:
         """
-        Get all non-deleted users with pagination.
+        Get all non-deleted users, newest first.
+        Pages are addressed by an opaque `(created_at, id)` cursor so every page
+        is a single index range scan; `skip` is only honoured when no cursor is
+        given and is kept for backwards compatibility.
         Fetches one extra item to determine if `has_more` is true.
+        With `rows=True` plain column rows (without the password hash) are
+        returned instead of ORM objects, for callers that only encode them;
+        `fields` then narrows the columns selected (the sort key is always included).
         """
-        stmt = select(User).where(User.is_deleted == False).offset(skip).limit(limit + 1).order_by(User.created_at.desc())
-        result = await session.execute(stmt)
-        users = result.scalars().all()
+        if starting_after and ending_before:
+            raise InvalidCursorException("Only one of starting_after or ending_before may be set")
+
+        sort_key = tuple_(User.created_at, User.id)
+        stmt = select(*_user_columns(fields, "id", "created_at")) if rows else select(User)
+        stmt = stmt.where(User.is_deleted == False)
+
+        if starting_after:
+            stmt = stmt.where(sort_key < self._cursor_key(starting_after))
+        elif ending_before:
+            stmt = stmt.where(sort_key > self._cursor_key(ending_before))
+        else:
+            stmt = stmt.offset(skip)
+
+        if ending_before:
+            # Walk backwards from the cursor, then flip the page back to newest first
+            stmt = stmt.order_by(User.created_at.asc(), User.id.asc())
+        else:
+            stmt = stmt.order_by(User.created_at.desc(), User.id.desc())
+
+        result = await session.execute(stmt.limit(limit + 1))
+        users = list(result.all() if rows else result.scalars().all())
 
         has_more = len(users) > limit
-        return list(users[:limit]), has_more
+        users = users[:limit]
+        if ending_before:
+            users.reverse()
+        return users, has_more
+
+    @staticmethod
+    def _cursor_key(cursor: str):
+        created_at, user_id = decode_cursor(cursor)
+        # created_at is bound as text so it compares byte-for-byte with the stored value
+        return tuple_(literal(created_at, String), literal(user_id, User.__table__.c.id.type))
+
+    async def get_user_by_id(
+        self, user_id: uuid.UUID, session: AsyncSession, fields: Optional[Sequence[str]] = None
+    ) -> Any:
+        """
+        Get a single non-deleted user by id. With `fields` only those columns
+        (plus `id` and `version`) are selected and a plain row is returned.
+        """
+        if fields is not None:
+            stmt = select(*_user_columns(fields, "id", "version")).where(User.id == user_id, User.is_deleted == False)
+            row = (await session.execute(stmt)).first()
+            if row is None:
+                raise UserNotFoundException("User not found")
+            return row
 
-    async def get_user_by_id(self, user_id: uuid.UUID, session: AsyncSession) -> User:
-        """Get a single non-deleted user by id."""
         user = await session.get(User, user_id)
         if not user or user.is_deleted:
             raise UserNotFoundException("User not found")
         return user
 
-    async def update_part_of_a_user(self, user_id: uuid.UUID, user_data: UserUpdateSchema, session: AsyncSession) -> User:
-        """Partially update a user's details."""
-        db_user = await self.get_user_by_id(user_id, session) # Reuse get_user_by_id to handle not found/deleted cases
+    async def get_users_by_ids(
+        self, user_ids: List[uuid.UUID], session: AsyncSession, fields: Optional[Sequence[str]] = None
+    ) -> Tuple[List[Row], List[uuid.UUID]]:
+        """
+        Resolve many non-deleted users with a single IN query, as plain rows of
+        their public columns (or just `fields` and `id`).
+        Returns the users in the order requested and the ids that were not found.
+        """
+        requested = list(dict.fromkeys(user_ids))  # Drop repeats, keep order
+        stmt = select(*_user_columns(fields, "id")).where(User.id.in_(requested)).where(User.is_deleted == False)
+        found = {row.id: row for row in (await session.execute(stmt)).all()}
+
+        users = [found[user_id] for user_id in requested if user_id in found]
+        missing = [user_id for user_id in requested if user_id not in found]
+        return users, missing
+
+    async def search_users(
+        self,
+        q: str,
+        session: AsyncSession,
+        limit: int = 10,
+        starting_after: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Row], bool]:
+        """
+        Rank non-deleted users matching every term of `q` by name, username or
+        email (each term also matches as a prefix) through the FTS5 index.
+        Returns rows of the public columns (or just `fields` and `id`) plus
+        `rank`, best match first, keyset-paginated on `(rank, id)`.
+        Fetches one extra item to determine if `has_more` is true.
+        """
+        match = _fts_match_expression(q)
+        if match is None:
+            return [], False
+
+        stmt = (
+            select(*_user_columns(fields, "id"), users_fts.c.rank)
+            .join(users_fts, users_fts.c.rowid == literal_column("users.rowid"))
+            .where(text("users_fts MATCH :match").bindparams(match=match))
+            .where(User.is_deleted == False)
+        )
+        if starting_after:
+            rank, user_id = decode_search_cursor(starting_after)
+            stmt = stmt.where(
+                tuple_(users_fts.c.rank, User.id) > tuple_(literal(rank, Float), literal(user_id, User.__table__.c.id.type))
+            )
+        stmt = stmt.order_by(users_fts.c.rank, User.id).limit(limit + 1)
 
+        hits = list((await session.execute(stmt)).all())
+        return hits[:limit], len(hits) > limit
+
+    async def update_part_of_a_user(
+        self,
+        user_id: uuid.UUID,
+        user_data: UserUpdateSchema,
+        session: AsyncSession,
+        expected_versions: Optional[List[int]] = None,
+    ) -> User:
+        """
+        Partially update a user's details with a single conditional
+        `UPDATE ... RETURNING`. Username/email clashes are detected by the
+        unique indexes rather than a racy check-then-update.
+        When `expected_versions` is given the update only applies if the
+        user's current version is one of them (optimistic concurrency).
+        """
         update_data = user_data.model_dump(exclude_unset=True)
 
         if not update_data:
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
 
-        # Check for username/email conflicts if they are being updated
-        if 'username' in update_data or 'email' in update_data:
-            query_filter = []
-            if 'username' in update_data:
-                query_filter.append(User.username == update_data['username'])
-            if 'email' in update_data:
-                query_filter.append(User.email == update_data['email'])
-            
-            stmt = select(User).where(User.id != user_id).where(or_(*query_filter))
-            existing_user = (await session.execute(stmt)).scalars().first()
-            if existing_user:
-                if 'username' in update_data and existing_user.username == update_data['username']:
-                    raise UsernameConflictException("Username already registered")
-                if 'email' in update_data and existing_user.email == update_data['email']:
-                    raise EmailConflictException("Email already in use")
-
-        for key, value in update_data.items():
-            setattr(db_user, key, value)
-
-        session.add(db_user)
-        await session.commit()
-        await session.refresh(db_user)
+        old = None
+        if audit_log.enabled and update_data.keys() & {"firstname", "lastname", "email"}:
+            # RETURNING only sees the new row, so read the values the event needs first
+            old = (await session.execute(select(*AUDIT_COLUMNS).where(User.id == user_id))).mappings().first()
+
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.is_deleted == False)
+            .values(**update_data, version=User.version + 1)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        if expected_versions is not None:
+            stmt = stmt.where(User.version.in_(expected_versions))
+        try:
+            db_user = (await session.scalars(stmt)).one_or_none()
+            if db_user is None:
+                if expected_versions is not None and await self._is_active_user(user_id, session):
+                    raise PreconditionFailedException("User has been modified since it was read")
+                raise UserNotFoundException("User not found")
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            conflict = conflict_from_integrity_error(e, email_message="Email already in use")
+            if conflict is None:
+                raise
+            raise conflict
+
+        new = _audit_values(db_user)
+        await audit_log.updated(user_id, old or new, new)
+        await user_cache.invalidate(user_id)
+        if 'email' in update_data:
+            # Outstanding tokens are issued for the old email
+            await bump_user_version(str(user_id))
         return db_user
 
+    @staticmethod
+    async def _is_active_user(user_id: uuid.UUID, session: AsyncSession) -> bool:
+        stmt = select(User.id).where(User.id == user_id, User.is_deleted == False)
+        return (await session.execute(stmt)).first() is not None
+
     async def soft_delete_user(self, user_id: uuid.UUID, session: AsyncSession) -> None:
         """Soft delete a user by setting is_deleted to True."""
-        user = await session.get(User, user_id)
-        if not user or user.is_deleted:
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.is_deleted == False)
+            .values(is_deleted=True, deleted_at=func.now(), version=User.version + 1)
+            .returning(*AUDIT_COLUMNS)
+        )
+        row = (await session.execute(stmt)).mappings().first()
+        if row is None:
             raise UserNotFoundException("User not found or already deleted")
 
-        user.is_deleted = True
-        session.add(user)
         await session.commit()
+        await audit_log.updated(user_id, {**row, "is_deleted": False}, row)
+        await user_cache.invalidate(user_id)
+        await bump_user_version(str(user_id))
 
     async def restore_user(self, user_id: uuid.UUID, session: AsyncSession) -> User:
         """Restore a soft-deleted user."""
-        user = await session.get(User, user_id)
-        if not user:
-            raise UserNotFoundException("User not found")
-        
-        if not user.is_deleted:
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.is_deleted == True)
+            .values(is_deleted=False, deleted_at=None, version=User.version + 1)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        user = (await session.scalars(stmt)).one_or_none()
+        if user is None:
+            # Only the failure path pays for a second query to tell the cases apart
+            if await session.get(User, user_id) is None:
+                raise UserNotFoundException("User not found")
             raise UserNotDeletedException("User is not deleted")
 
-        user.is_deleted = False
-        session.add(user)
         await session.commit()
-        await session.refresh(user)
+        new = _audit_values(user)
+        await audit_log.updated(user_id, {**new, "is_deleted": True}, new)
+        await user_cache.invalidate(user_id)
         return user
 
     async def hard_delete_user(self, user_id: uuid.UUID, session: AsyncSession) -> None:
         """Permanently delete a user from the database."""
-        user = await session.get(User, user_id)
-        if not user:
+        stmt = delete(User).where(User.id == user_id).returning(*AUDIT_COLUMNS)
+        row = (await session.execute(stmt)).first()
+        if row is None:
             raise UserNotFoundException("User not found")
 
-        await session.delete(user)
-        await session.commit()
\ No newline at end of file
+        await session.commit()
+        await audit_log.deleted(user_id, row.firstname, row.lastname, row.email)
+        await user_cache.invalidate(user_id)
+        await bump_user_version(str(user_id))
+
+    async def bulk_action(
+        self,
+        action: BulkAction,
+        selection: BulkUserSelectionSchema,
+        session: AsyncSession,
+        chunk_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Soft-deletes, restores or hard-deletes every selected user with one
+        set-based `UPDATE`/`DELETE ... RETURNING` and commit per chunk, yielding
+        a progress record after each. In "trigger" audit mode the activity-log
+        triggers fire inside each statement, so a chunk and its audit rows are
+        committed together; in "queue" mode the chunk's events are queued after
+        its commit. The chunk's cache invalidations and token revocations are
+        then sent in one round-trip each. If revoking fails the chunk is reported
+        as failed and no further chunks are processed, since their users would
+        keep working tokens too.
+        """
+        conditions = _bulk_conditions(action, selection)
+        total = 0
+        chunk = 0
+        failed = False
+
+        async def run(target) -> Tuple[List[uuid.UUID], bool]:
+            if action == "hard_delete":
+                stmt = delete(User).where(User.id.in_(target), *conditions)
+            elif action == "soft_delete":
+                stmt = update(User).where(User.id.in_(target), *conditions).values(
+                    is_deleted=True, deleted_at=func.now(), version=User.version + 1
+                )
+            else:
+                stmt = update(User).where(User.id.in_(target), *conditions).values(
+                    is_deleted=False, deleted_at=None, version=User.version + 1
+                )
+            rows = (await session.execute(stmt.returning(*AUDIT_COLUMNS))).mappings().all()
+            await session.commit()
+
+            for row in rows:
+                if action == "hard_delete":
+                    await audit_log.deleted(row["id"], row["firstname"], row["lastname"], row["email"])
+                else:
+                    await audit_log.updated(row["id"], {**row, "is_deleted": not row["is_deleted"]}, row)
+            affected = [row["id"] for row in rows]
+            await user_cache.invalidate_many(affected)
+            if action != "restore" and affected:
+                try:
+                    await bump_user_versions([str(user_id) for user_id in affected])
+                except BlocklistUnavailableError:
+                    return affected, False
+            return affected, True
+
+        def progress(affected: List[uuid.UUID], revoked: bool) -> Dict[str, Any]:
+            record = {"object": "bulk_progress", "chunk": chunk, "affected": len(affected), "total": total}
+            if not revoked:
+                record["status"] = "failed"
+                record["error"] = {
+                    "code": "service_unavailable",
+                    "message": "The chunk was committed but its users' tokens could not be revoked",
+                }
+            return record
+
+        if selection.ids is not None:
+            requested = list(dict.fromkeys(selection.ids))
+            for i in range(0, len(requested), chunk_size):
+                affected, revoked = await run(requested[i:i + chunk_size])
+                chunk += 1
+                total += len(affected)
+                yield progress(affected, revoked)
+                if not revoked:
+                    failed = True
+                    break
+        else:
+            # Every chunk takes its users out of the selection, so re-selecting the
+            # first `chunk_size` matches walks the whole set
+            while True:
+                affected, revoked = await run(select(User.id).where(*conditions).limit(chunk_size))
+                if not affected:
+                    break
+                chunk += 1
+                total += len(affected)
+                yield progress(affected, revoked)
+                if not revoked:
+                    failed = True
+                    break
+
+        summary = {"object": "bulk_summary", "action": action, "affected": total}
+        if failed:
+            summary["status"] = "failed"
+        yield summary
+
+    async def import_users(
+        self, records: AsyncIterator[Tuple[int, Any]], session: AsyncSession, batch_size: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Creates users from a stream of `(line_number, record)` pairs, yielding one
+        result per record in input order. Records are handled in batches: one
+        conflict query, parallel password hashing, one multi-row INSERT and one
+        commit per batch. The `log_user_create` trigger fires inside that same
+        transaction, so audit rows cost no extra round-trip or commit.
+        """
+        batch = []
+        async for line_number, record in records:
+            batch.append((line_number, record))
+            if len(batch) >= batch_size:
+                for result in await self._import_batch(batch, session):
+                    yield result
+                batch = []
+        if batch:
+            for result in await self._import_batch(batch, session):
+                yield result
+
+    async def _import_batch(self, batch: List[Tuple[int, Any]], session: AsyncSession) -> List[Dict[str, Any]]:
+        results: Dict[int, Dict[str, Any]] = {}
+        accepted: List[Tuple[int, UserImportSchema]] = []
+        usernames, emails = set(), set()
+
+        for line_number, record in batch:
+            if isinstance(record, Exception):
+                results[line_number] = _import_failure(line_number, "invalid_row", str(record))
+                continue
+            try:
+                row = UserImportSchema.model_validate(record)
+            except ValidationError as e:
+                message = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors())
+                results[line_number] = _import_failure(line_number, "invalid_row", message)
+                continue
+            if row.hashed_password is not None and passwd_context.identify(row.hashed_password) != "bcrypt":
+                results[line_number] = _import_failure(line_number, "invalid_row", "hashed_password must be a bcrypt hash")
+                continue
+            # Duplicates within the upload itself
+            if row.username in usernames:
+                results[line_number] = _import_failure(line_number, "username_taken", "Username already registered")
+                continue
+            if row.email in emails:
+                results[line_number] = _import_failure(line_number, "email_in_use", "Email already registered")
+                continue
+            usernames.add(row.username)
+            emails.add(row.email)
+            accepted.append((line_number, row))
+
+        if accepted:
+            stmt = select(User.username, User.email).where(
+                or_(User.username.in_(usernames), User.email.in_(emails))
+            )
+            existing = (await session.execute(stmt)).all()
+            taken_usernames = {username for username, _ in existing}
+            taken_emails = {email for _, email in existing}
+
+            new_rows = []
+            for line_number, row in accepted:
+                if row.username in taken_usernames:
+                    results[line_number] = _import_failure(line_number, "username_taken", "Username already registered")
+                elif row.email in taken_emails:
+                    results[line_number] = _import_failure(line_number, "email_in_use", "Email already registered")
+                else:
+                    new_rows.append((line_number, row))
+
+            hashes = iter(await _hash_passwords([row.password for _, row in new_rows if row.password is not None]))
+            values = []
+            for line_number, row in new_rows:
+                values.append({
+                    "id": uuid.uuid4(),
+                    "firstname": row.firstname,
+                    "lastname": row.lastname,
+                    "email": row.email,
+                    "username": row.username,
+                    "role": row.role,
+                    "hashed_password": row.hashed_password if row.hashed_password is not None else next(hashes),
+                    "is_deleted": False,
+                })
+            results.update(await self._insert_import_rows(
+                [line_number for line_number, _ in new_rows], values, session
+            ))
+
+        return [results[line_number] for line_number, _ in batch]
+
+    async def _insert_import_rows(
+        self, line_numbers: List[int], values: List[Dict[str, Any]], session: AsyncSession
+    ) -> Dict[int, Dict[str, Any]]:
+        if not values:
+            return {}
+        try:
+            await session.execute(User.__table__.insert(), values)
+            await session.commit()
+            for row in values:
+                await audit_log.created(row["id"], row["firstname"], row["lastname"], row["email"])
+            return {
+                line_number: {"line": line_number, "status": "created", "id": str(row["id"])}
+                for line_number, row in zip(line_numbers, values)
+            }
+        except IntegrityError:
+            await session.rollback()
+
+        # A concurrent write claimed one of the names after the conflict query;
+        # fall back to row-by-row inserts so only the clashing rows fail
+        results = {}
+        for line_number, row in zip(line_numbers, values):
+            try:
+                await session.execute(User.__table__.insert(), [row])
+                await session.commit()
+                await audit_log.created(row["id"], row["firstname"], row["lastname"], row["email"])
+                results[line_number] = {"line": line_number, "status": "created", "id": str(row["id"])}
+            except IntegrityError as e:
+                await session.rollback()
+                conflict = conflict_from_integrity_error(e)
+                if conflict is None:
+                    raise
+                code = "username_taken" if isinstance(conflict, UsernameConflictException) else "email_in_use"
+                results[line_number] = _import_failure(line_number, code, str(conflict))
+        return results
+
+
+    async def stream_users(
+        self,
+        session: AsyncSession,
+        created_after: Optional[datetime] = None,
+        updated_after: Optional[datetime] = None,
+        include_deleted: bool = False,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields users as batches of plain dicts, oldest first, read through a
+        server-side cursor so memory stays flat however large the table is.
+        `updated_after` selects users with any logged activity since then.
+        """
+        stmt = select(*USER_PUBLIC_COLUMNS).order_by(User.created_at, User.id)
+        if not include_deleted:
+            stmt = stmt.where(User.is_deleted == False)
+        if created_after is not None:
+            stmt = stmt.where(User.created_at > created_after)
+        if updated_after is not None:
+            stmt = stmt.where(User.id.in_(
+                select(UserActivityLog.user_id).where(UserActivityLog.performed_at > updated_after)
+            ))
+
+        async for batch in _stream_mappings(session, stmt, batch_size):
+            yield batch
+
+    async def get_activity_logs(
+        self,
+        session: AsyncSession,
+        user_id: Optional[uuid.UUID] = None,
+        limit: int = 10,
+        starting_after: Optional[str] = None,
+    ) -> Tuple[List[UserActivityLog], bool]:
+        """
+        Get activity log rows newest first, for one user or across all users.
+        Pages are keyed on `(performed_at, id)`, matching the activity indexes.
+        Fetches one extra item to determine if `has_more` is true.
+        """
+        stmt = select(UserActivityLog)
+        if user_id is not None:
+            stmt = stmt.where(UserActivityLog.user_id == user_id)
+        if starting_after:
+            performed_at, log_id = decode_activity_cursor(starting_after)
+            stmt = stmt.where(
+                tuple_(UserActivityLog.performed_at, UserActivityLog.id)
+                < tuple_(literal(performed_at, String), literal(log_id))
+            )
+        stmt = stmt.order_by(UserActivityLog.performed_at.desc(), UserActivityLog.id.desc())
+
+        logs = list((await session.execute(stmt.limit(limit + 1))).scalars().all())
+        return logs[:limit], len(logs) > limit
+
+    async def stream_activity_logs(
+        self,
+        session: AsyncSession,
+        performed_after: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yields activity log rows as batches of plain dicts in insertion order."""
+        stmt = select(*UserActivityLog.__table__.columns).order_by(UserActivityLog.id)
+        if performed_after is not None:
+            stmt = stmt.where(UserActivityLog.performed_at > performed_after)
+
+        async for batch in _stream_mappings(session, stmt, batch_size):
+            yield batch
+
+
+# Never leaves the service, in an export or an API response
+USER_EXPORT_EXCLUDED = {"hashed_password"}
+USER_PUBLIC_COLUMNS = [column for column in User.__table__.columns if column.name not in USER_EXPORT_EXCLUDED]
+USER_EXPORT_COLUMNS = [column.name for column in USER_PUBLIC_COLUMNS]
+ACTIVITY_EXPORT_COLUMNS = [column.name for column in UserActivityLog.__table__.columns]
+
+
+async def _stream_mappings(session: AsyncSession, stmt, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    result = await session.stream(stmt.execution_options(yield_per=batch_size))
+    async for partition in result.mappings().partitions(batch_size):
+        yield [dict(row) for row in partition]
+
+
+def _user_columns(fields: Optional[Sequence[str]], *required: str) -> List[Any]:
+    """The public user columns to select for `fields` (all of them when None), plus the `required` key columns."""
+    if fields is None:
+        return USER_PUBLIC_COLUMNS
+    wanted = {*fields, *required}
+    return [column for column in USER_PUBLIC_COLUMNS if column.name in wanted]
+
+
+def _audit_values(user: User) -> Dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in AUDIT_COLUMNS}
+
+
+def _fts_match_expression(q: str) -> Optional[str]:
+    """
+    Turns free text into an FTS5 query: every whitespace-separated term becomes
+    a quoted prefix phrase, so user input can never inject FTS5 syntax.
+    """
+    terms = [term for term in q.split() if _FTS_TOKEN.search(term)]
+    if not terms:
+        return None
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def _bulk_conditions(action: BulkAction, selection: BulkUserSelectionSchema) -> List[Any]:
+    conditions = []
+    if action == "soft_delete":
+        conditions.append(User.is_deleted == False)
+    elif action == "restore":
+        conditions.append(User.is_deleted == True)
+    if selection.created_after is not None:
+        conditions.append(User.created_at > selection.created_after)
+    if selection.created_before is not None:
+        conditions.append(User.created_at < selection.created_before)
+    if selection.deleted_older_than_days is not None:
+        # deleted_at is written by SQLite's CURRENT_TIMESTAMP, i.e. naive UTC
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=selection.deleted_older_than_days)
+        conditions.extend([User.is_deleted == True, User.deleted_at < cutoff])
+    return conditions
+
+
+async def _hash_passwords(passwords: List[str]) -> List[str]:
+    # Keep at most one job per hashing worker in flight so a large batch never
+    # overflows the pool's queue and starves interactive logins
+    slots = asyncio.Semaphore(password_hash_pool.workers)
+
+    async def hash_one(password: str) -> str:
+        async with slots:
+            return await generate_passwd_hash_async(password)
+
+    return list(await asyncio.gather(*(hash_one(password) for password in passwords)))
+
+
+def _import_failure(line_number: int, code: str, message: str) -> Dict[str, Any]:
+    return {"line": line_number, "status": "failed", "error": {"code": code, "message": message}}
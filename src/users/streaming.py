@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import uuid
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Sequence, Tuple
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Splits a streamed body into `(line_number, line)` pairs, skipping blank lines."""
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line.decode("utf-8").rstrip("\r")
+    if buffer.strip():
+        yield line_number + 1, buffer.decode("utf-8").rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yields `(line_number, record)` for every line of an NDJSON body. A line that
+    is not valid JSON yields a `ValueError` as its record so the caller can
+    report it and carry on with the rest of the stream.
+    """
+    async for line_number, line in iter_lines(chunks):
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yields `(line_number, record)` for every row of a CSV body whose first line
+    is the header. Rows are read one line at a time, so quoted fields must not
+    span lines.
+    """
+    header = None
+    async for line_number, line in iter_lines(chunks):
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_number, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        record: Dict[str, str] = dict(zip(header, values))
+        yield line_number, record
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_ndjson(rows: Iterable[Dict[str, Any]]) -> bytes:
+    """Encodes rows as newline-delimited JSON, with UUIDs and datetimes as strings."""
+    return "".join(json.dumps(row, default=_json_default) + "\n" for row in rows).encode()
+
+
+async def encode_ndjson(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Encodes each batch of rows as one chunk of newline-delimited JSON."""
+    async for rows in batches:
+        yield to_ndjson(rows)
+
+
+async def encode_csv(batches: AsyncIterator[List[Dict[str, Any]]], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    """Encodes each batch of rows as one chunk of CSV, preceded by a header line."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns))
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compresses a byte stream into a single gzip member, flushing after every chunk."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
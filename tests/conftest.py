@@ -0,0 +1,66 @@
+import os
+import tempfile
+import uuid
+
+# `src` creates its engines and reads its settings on import, so the test
+# environment has to be in place first
+DATA_DIR = tempfile.mkdtemp(prefix="tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(DATA_DIR, 'test.db')}"
+os.environ.setdefault("JWT_SECRET", "test-secret-0123456789abcdef0123456789")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ["BLOCKLIST_BACKEND"] = "memory"
+os.environ["AUTH_MODE"] = "database"
+os.environ["AUDIT_LOG_MODE"] = "trigger"
+
+import httpx
+import pytest
+from sqlalchemy import update
+
+from src import app
+from src.database.main import AsyncSessionLocal, init_db
+from src.users.cache import user_cache
+from src.users.models import User
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client():
+    await init_db()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def create_user(client):
+    async def create() -> tuple[dict, dict]:
+        """Signs up and logs in a new user, returning the user and its auth headers."""
+        name = uuid.uuid4().hex[:12]
+        credentials = {"email": f"{name}@example.com", "password": "password123"}
+        response = await client.post(
+            "/api/v1/auth/signup", json={**credentials, "firstname": "Test", "lastname": "User", "username": name}
+        )
+        assert response.status_code == 201, response.text
+        user = response.json()
+        response = await client.post("/api/v1/auth/login", json=credentials)
+        assert response.status_code == 200, response.text
+        return user, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return create
+
+
+@pytest.fixture
+def create_admin(create_user):
+    async def create() -> tuple[dict, dict]:
+        """Like `create_user`, with the user promoted to admin."""
+        user, headers = await create_user()
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(User).where(User.id == uuid.UUID(user["id"])).values(role="admin"))
+            await session.commit()
+        user_cache.invalidate_local(uuid.UUID(user["id"]))
+        return {**user, "role": "admin"}, headers
+
+    return create
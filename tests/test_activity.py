@@ -0,0 +1,63 @@
+import gzip
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from src.database.main import AsyncSessionLocal
+from src.users.retention import archive_activity_logs
+
+pytestmark = pytest.mark.anyio
+
+
+async def _user_with_activity(client, create_user, create_admin, updates: int) -> tuple[dict, dict]:
+    user, _ = await create_user()
+    _, admin = await create_admin()
+    for i in range(updates):
+        response = await client.patch(f"/api/v1/users/{user['id']}", json={"firstname": f"Name{i}"}, headers=admin)
+        assert response.status_code == 200
+    return user, admin
+
+
+async def test_user_activity_pages_newest_first_without_gaps(client, create_user, create_admin):
+    user, admin = await _user_with_activity(client, create_user, create_admin, updates=4)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"starting_after": cursor} if cursor else {})}
+        response = await client.get(f"/api/v1/users/{user['id']}/activity", params=params, headers=admin)
+        page = response.json()
+        seen += page["data"]
+        if not page["has_more"]:
+            break
+        cursor = page["next_cursor"]
+
+    assert len(seen) == 5  # The signup and four updates, most within the same second
+    assert seen[-1]["action"] == "CREATE"
+    keys = [(log["performed_at"], log["id"]) for log in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+async def test_old_activity_is_moved_to_monthly_archives(client, create_user, create_admin, tmp_path):
+    user, _ = await _user_with_activity(client, create_user, create_admin, updates=2)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("UPDATE user_activity_logs SET performed_at = '2020-01-15 10:00:00' WHERE user_id = :user_id"),
+            {"user_id": uuid.UUID(user["id"]).hex},
+        )
+        await session.commit()
+
+    moved = await archive_activity_logs(datetime(2021, 1, 1), directory=str(tmp_path), chunk_size=2)
+
+    assert moved == 3
+    with gzip.open(tmp_path / "user_activity_logs-2020-01.ndjson.gz") as archive:
+        rows = [json.loads(line) for line in archive]
+    assert [row["action"] for row in rows] == ["CREATE", "UPDATE", "UPDATE"]
+    async with AsyncSessionLocal() as session:
+        left = (await session.execute(
+            text("SELECT count(*) FROM user_activity_logs WHERE user_id = :user_id"),
+            {"user_id": uuid.UUID(user["id"]).hex},
+        )).scalar()
+    assert left == 0
@@ -0,0 +1,26 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from src.database.main import AsyncSessionLocal
+from src.users.audit import AuditLogWriter
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_queued_events_are_stored_like_trigger_rows(create_user):
+    user, _ = await create_user()  # The log_user_create trigger writes the first row
+    writer = AuditLogWriter(enabled=True, max_size=10, batch_size=10, flush_interval=0.1)
+    await writer.created(uuid.UUID(user["id"]), "Queued", "User", "queued@example.com")
+    await writer.flush()
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            text("SELECT performed_at, details FROM user_activity_logs WHERE user_id = :user_id ORDER BY id"),
+            {"user_id": uuid.UUID(user["id"]).hex},
+        )).all()
+    (trigger_performed_at, trigger_details), (queued_performed_at, queued_details) = rows
+    assert len(queued_performed_at) == len(trigger_performed_at) == len("2025-01-01 00:00:00")
+    assert trigger_details == '{"firstname":"Test","lastname":"User","email":"%s"}' % user["email"]
+    assert queued_details == '{"firstname":"Queued","lastname":"User","email":"queued@example.com"}'
@@ -0,0 +1,94 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from redis.exceptions import RedisError
+
+from src.auth.dependencies import _role_from_claims, _role_from_user, get_current_role, verify_token
+from src.auth.errors import register_auth_errors
+from src.auth.utils import create_access_token
+from src.config import Config
+from src.database import redis as blocklist
+from src.database.blocklist import BlocklistUnavailableError, CircuitBreakerBackend, InMemoryBlocklistBackend
+from src.query_budget import assert_max_queries
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def claims_client():
+    """An app whose route resolves the caller's role the way AUTH_MODE=claims does."""
+    app = FastAPI()
+    register_auth_errors(app)
+
+    @app.get("/role")
+    async def role(role: str = Depends(_role_from_claims)) -> dict:
+        return {"role": role}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def _token(user: dict, **claims) -> dict:
+    token = create_access_token(user_data={"sub": user["email"], "id": user["id"], "ver": 0, **claims})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_claims_mode_authorizes_from_the_token_alone(claims_client, create_user):
+    user, _ = await create_user()
+
+    with assert_max_queries(0):
+        response = await claims_client.get("/role", headers=_token(user, role="admin"))
+    assert response.json() == {"role": "admin"}
+
+
+async def test_claims_mode_loads_the_user_for_tokens_without_a_role(claims_client, create_user):
+    user, _ = await create_user()
+
+    with assert_max_queries(1):
+        response = await claims_client.get("/role", headers=_token(user))
+    assert response.json() == {"role": "user"}
+
+
+async def test_database_mode_authorizes_from_the_user_row(client, create_user):
+    assert get_current_role is _role_from_user  # The suite runs with AUTH_MODE=database
+    _, headers = await create_user()
+
+    response = await client.get("/api/v1/users/all", headers=headers)
+    assert response.status_code == 403
+    assert response.json()["error"]["code"] == "insufficient_permissions"
+
+
+class _UnavailableBackend(InMemoryBlocklistBackend):
+    async def get_user_version(self, user_id: str) -> int:
+        raise RedisError("Connection refused")
+
+
+@pytest.fixture
+def blocklist_outage(monkeypatch):
+    """Starts an outage of the user version store, behind the circuit breaker."""
+    def start() -> CircuitBreakerBackend:
+        backend = CircuitBreakerBackend(_UnavailableBackend(), failure_threshold=1, reset_seconds=60, call_timeout=1)
+        monkeypatch.setattr(blocklist, "blocklist_backend", backend)
+        monkeypatch.setattr(Config, "USER_VERSION_CACHE_SECONDS", 0)  # Every check goes back to the store
+        return backend
+    return start
+
+
+async def test_user_version_check_serves_the_last_version_during_an_outage(create_user, blocklist_outage):
+    user, _ = await create_user()
+    token = _token(user)["Authorization"].split()[1]
+    blocklist._user_versions[user["id"]] = (0.0, 0)  # Seen before the outage, now expired
+    backend = blocklist_outage()
+
+    payload = await verify_token(token, "access")
+    assert payload["user"]["id"] == user["id"]
+    assert backend.is_open
+
+
+async def test_user_version_check_fails_for_users_never_seen_during_an_outage(create_user, blocklist_outage):
+    user, _ = await create_user()
+    blocklist._user_versions.pop(user["id"], None)
+    blocklist_outage()
+
+    with pytest.raises(BlocklistUnavailableError):
+        await verify_token(_token(user)["Authorization"].split()[1], "access")
@@ -0,0 +1,22 @@
+import uuid
+
+import pytest
+
+from src.auth.service import AuthService
+from src.database.main import AsyncSessionLocal
+from src.users.models import User
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_update_user_increments_the_version_in_the_database(create_user):
+    created, _ = await create_user()
+    async with AsyncSessionLocal() as session:
+        user = await session.get(User, uuid.UUID(created["id"]))
+        stale = User(**user.model_dump())  # Another request's copy, read before the first update
+
+        first_version = (await AuthService().update_user(user, {"firstname": "First"}, session)).version
+        second = await AuthService().update_user(stale, {"firstname": "Second"}, session)
+
+    assert (first_version, second.version) == (created["version"] + 1, created["version"] + 2)
+    assert second.firstname == "Second"
@@ -0,0 +1,75 @@
+import time
+import uuid
+
+import pytest
+
+from benchmarks.inmemory_redis import InMemoryRedis
+from src.config import Config
+from src.database import redis as blocklist
+from src.database.blocklist import RedisBlocklistBackend
+from src.database.bloom import BloomFilter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """A Redis-backed blocklist on the in-process stand-in, with a fresh filter in front of it."""
+    fake = InMemoryRedis()
+    monkeypatch.setattr(blocklist, "blocklist_backend", RedisBlocklistBackend(fake))
+    monkeypatch.setattr(blocklist, "revoked_jti_filter", blocklist.RevokedJtiFilter(
+        capacity=100, error_rate=0.001, sync_interval=1.0
+    ))
+    monkeypatch.setattr(Config, "BLOCKLIST_FILTER_ENABLED", True)
+    return fake
+
+
+def test_bloom_filter_counts_distinct_items():
+    bloom = BloomFilter(capacity=10)
+    for _ in range(20):
+        bloom.add("same-jti")
+
+    assert bloom.count == 1
+    assert not bloom.is_saturated
+    assert bloom.might_contain("same-jti")
+
+
+async def test_rebuild_loads_existing_revocations(redis):
+    await blocklist.add_jti_to_blocklist("revoked", expires_at=time.time() + 60)
+    await blocklist.revoked_jti_filter.rebuild()
+
+    assert blocklist.revoked_jti_filter.ready
+    assert blocklist.revoked_jti_filter.might_contain("revoked")
+    assert await blocklist.token_in_blocklist("revoked")
+
+
+async def test_live_tokens_are_answered_without_redis(redis):
+    await blocklist.revoked_jti_filter.rebuild()
+    redis.commands = 0
+
+    assert not await blocklist.token_in_blocklist(str(uuid.uuid4()))
+    assert redis.commands == 0
+
+
+async def test_sync_picks_up_revocations_from_other_workers(redis):
+    await blocklist.revoked_jti_filter.rebuild()
+    # Written straight to the store, as another worker's logout would be
+    await blocklist.blocklist_backend.add("elsewhere", 60, time.time())
+    assert not blocklist.revoked_jti_filter.might_contain("elsewhere")
+
+    await blocklist.revoked_jti_filter.sync()
+    assert blocklist.revoked_jti_filter.might_contain("elsewhere")
+    assert await blocklist.token_in_blocklist("elsewhere")
+
+
+async def test_repeated_syncs_do_not_saturate_the_filter(redis):
+    await blocklist.revoked_jti_filter.rebuild()
+    for i in range(10):
+        await blocklist.blocklist_backend.add(f"jti-{i}", 60, time.time())
+
+    for _ in range(50):  # Every sync re-reads the overlap window
+        await blocklist.revoked_jti_filter.sync()
+
+    bloom = blocklist.revoked_jti_filter._filter
+    assert bloom.count == 10
+    assert not bloom.is_saturated
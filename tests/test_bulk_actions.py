@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from src.database.blocklist import BlocklistUnavailableError
+from src.users import services
+
+pytestmark = pytest.mark.anyio
+
+
+async def _bulk(client, headers, action: str, selection: dict, chunk_size: int = 1) -> list[dict]:
+    response = await client.post(
+        f"/api/v1/users/bulk/{action}", params={"chunk_size": chunk_size}, json=selection, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def test_soft_delete_reports_each_chunk_and_revokes_tokens(client, create_admin, create_user):
+    _, admin = await create_admin()
+    users = [await create_user() for _ in range(3)]
+
+    *progress, summary = await _bulk(client, admin, "soft-delete", {"ids": [user["id"] for user, _ in users]}, chunk_size=2)
+
+    assert [(record["chunk"], record["affected"], record["total"]) for record in progress] == [(1, 2, 2), (2, 1, 3)]
+    assert summary == {"object": "bulk_summary", "action": "soft_delete", "affected": 3}
+    for user, headers in users:
+        response = await client.get("/api/v1/users/me", headers=headers)
+        assert response.json()["error"]["code"] == "token_revoked"
+        assert (await client.get(f"/api/v1/users/{user['id']}", headers=admin)).status_code == 404
+
+
+async def test_restore_brings_back_only_soft_deleted_users(client, create_admin, create_user):
+    _, admin = await create_admin()
+    deleted, _ = await create_user()
+    active, _ = await create_user()
+    await _bulk(client, admin, "soft-delete", {"ids": [deleted["id"]]})
+
+    *_, summary = await _bulk(client, admin, "restore", {"ids": [deleted["id"], active["id"]]})
+
+    assert summary["affected"] == 1
+    response = await client.get(f"/api/v1/users/{deleted['id']}", headers=admin)
+    assert response.status_code == 200
+    assert response.json()["version"] == deleted["version"] + 2
+
+
+async def test_hard_delete_can_be_limited_to_soft_deleted_users(client, create_admin, create_user):
+    _, admin = await create_admin()
+    deleted, _ = await create_user()
+    active, _ = await create_user()
+    await _bulk(client, admin, "soft-delete", {"ids": [deleted["id"]]})
+
+    selection = {"ids": [deleted["id"], active["id"]], "deleted_older_than_days": 0}
+    *_, summary = await _bulk(client, admin, "hard-delete", selection)
+
+    assert summary == {"object": "bulk_summary", "action": "hard_delete", "affected": 1}
+    assert (await client.get(f"/api/v1/users/{active['id']}", headers=admin)).status_code == 200
+    *_, summary = await _bulk(client, admin, "restore", {"ids": [deleted["id"]]})
+    assert summary["affected"] == 0
+
+
+async def test_bulk_action_stops_when_tokens_cannot_be_revoked(client, create_admin, create_user, monkeypatch):
+    _, admin = await create_admin()
+    first, _ = await create_user()
+    second, _ = await create_user()
+
+    async def unavailable(user_ids):
+        raise BlocklistUnavailableError("Token blocklist is unavailable")
+
+    monkeypatch.setattr(services, "bump_user_versions", unavailable)
+    records = await _bulk(client, admin, "soft-delete", {"ids": [first["id"], second["id"]]})
+
+    assert len(records) == 2
+    assert records[0]["status"] == "failed"
+    assert records[0]["error"]["code"] == "service_unavailable"
+    assert records[1] == {"object": "bulk_summary", "action": "soft_delete", "affected": 1, "status": "failed"}
+    assert (await client.get(f"/api/v1/users/{second['id']}", headers=admin)).status_code == 200
+
+
+async def test_bulk_selection_needs_ids_or_a_filter(client, create_admin):
+    _, admin = await create_admin()
+
+    response = await client.post("/api/v1/users/bulk/soft-delete", json={}, headers=admin)
+    assert response.status_code == 422
@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+
+from src.users.etags import if_match_versions, if_none_match
+
+
+@pytest.fixture
+async def user_and_headers(client, create_user):
+    """Another user to read and update, and a caller's auth headers."""
+    user, _ = await create_user()
+    _, headers = await create_user()
+    return user, headers
+
+
+@pytest.mark.anyio
+async def test_unchanged_user_is_not_sent_again(client, user_and_headers):
+    user, headers = user_and_headers
+    response = await client.get(f"/api/v1/users/{user['id']}", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag == f'"{uuid.UUID(user["id"]).hex}-{user["version"]}"'
+
+    response = await client.get(f"/api/v1/users/{user['id']}", headers={**headers, "If-None-Match": f"W/{etag}"})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    await client.patch(f"/api/v1/users/{user['id']}", json={"firstname": "Changed"}, headers=headers)
+    response = await client.get(f"/api/v1/users/{user['id']}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.anyio
+async def test_update_with_a_stale_etag_fails_with_412(client, user_and_headers):
+    user, headers = user_and_headers
+    etag = (await client.get(f"/api/v1/users/{user['id']}", headers=headers)).headers["ETag"]
+
+    response = await client.patch(
+        f"/api/v1/users/{user['id']}", json={"firstname": "First"}, headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    response = await client.patch(
+        f"/api/v1/users/{user['id']}", json={"firstname": "Second"}, headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == 412
+    assert response.json()["error"]["code"] == "precondition_failed"
+    assert (await client.get(f"/api/v1/users/{user['id']}", headers=headers)).json()["firstname"] == "First"
+
+    response = await client.patch(
+        f"/api/v1/users/{user['id']}", json={"firstname": "Third"}, headers={**headers, "If-Match": "*"}
+    )
+    assert response.status_code == 200
+
+
+def test_if_match_ignores_weak_tags_and_other_users():
+    user_id, other_id = uuid.uuid4(), uuid.uuid4()
+    header = f'W/"{user_id.hex}-1", "{other_id.hex}-2", "{user_id.hex}-3"'
+
+    assert if_match_versions(header, user_id) == [3]
+    assert if_match_versions("*", user_id) is None
+    assert if_none_match(header, f'"{user_id.hex}-1"')
+    assert not if_none_match(None, f'"{user_id.hex}-1"')
@@ -0,0 +1,69 @@
+import gzip
+import json
+
+import pytest
+
+from src.compression import accepts_encoding
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_fields_narrows_a_user(client, create_user):
+    user, headers = await create_user()
+
+    response = await client.get(f"/api/v1/users/{user['id']}", params={"fields": "email, id"}, headers=headers)
+
+    assert response.json() == {"id": user["id"], "email": user["email"]}
+
+
+async def test_fields_narrows_a_batch(client, create_user):
+    user, headers = await create_user()
+
+    response = await client.post(
+        "/api/v1/users/batch", params={"fields": "username"}, json={"ids": [user["id"]]}, headers=headers
+    )
+
+    assert response.json()["data"] == [{"username": user["username"]}]
+
+
+async def test_unknown_fields_are_rejected(client, create_user):
+    user, headers = await create_user()
+
+    response = await client.get(f"/api/v1/users/{user['id']}", params={"fields": "id,hashed_password"}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "invalid_fields"
+
+
+async def test_large_responses_are_gzipped(client, create_admin, create_user):
+    _, headers = await create_admin()
+    for _ in range(10):
+        await create_user()
+
+    response = await client.get("/api/v1/users/all", params={"limit": 10}, headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()["data"]) == 10
+
+    response = await client.get(
+        "/api/v1/users/all", params={"limit": 10}, headers={**headers, "Accept-Encoding": "gzip;q=0"}
+    )
+    assert "Content-Encoding" not in response.headers
+
+
+async def test_small_and_precompressed_responses_are_sent_as_is(client, create_admin):
+    admin, headers = await create_admin()
+    headers = {**headers, "Accept-Encoding": "gzip"}
+
+    response = await client.get(f"/api/v1/users/{admin['id']}", params={"fields": "id"}, headers=headers)
+    assert "Content-Encoding" not in response.headers
+
+    response = await client.get("/api/v1/users/export", params={"gzip": "true"}, headers=headers)
+    assert "Content-Encoding" not in response.headers
+    first = json.loads(gzip.decompress(response.content).splitlines()[0])
+    assert "hashed_password" not in first
+
+
+def test_accept_encoding_honours_zero_quality():
+    assert accepts_encoding("br;q=0.5, gzip", "gzip")
+    assert not accepts_encoding("gzip;q=0", "gzip")
+    assert not accepts_encoding("deflate", "gzip")
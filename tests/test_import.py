@@ -0,0 +1,80 @@
+import json
+import uuid
+
+import pytest
+
+from src.users import services
+
+pytestmark = pytest.mark.anyio
+
+
+def _row(**overrides) -> dict:
+    name = uuid.uuid4().hex[:12]
+    return {
+        "firstname": "Imported", "lastname": "User", "email": f"{name}@example.com",
+        "username": name, "password": "password123", **overrides,
+    }
+
+
+async def _import(client, headers, body: str, content_type: str = "application/x-ndjson") -> list[dict]:
+    response = await client.post(
+        "/api/v1/users/import", content=body, headers={**headers, "Content-Type": content_type}
+    )
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def test_import_reports_every_row(client, create_admin, create_user):
+    _, headers = await create_admin()
+    existing, _ = await create_user()
+    duplicate = _row()
+    rows = [_row(), duplicate, {**_row(), "username": duplicate["username"]}, _row(username=existing["username"])]
+    body = "\n".join(json.dumps(row) for row in rows) + "\n{not json\n"
+
+    *results, summary = await _import(client, headers, body)
+
+    assert [(result["line"], result["status"]) for result in results] == [
+        (1, "created"), (2, "created"), (3, "failed"), (4, "failed"), (5, "failed"),
+    ]
+    assert [result["error"]["code"] for result in results[2:]] == ["username_taken", "username_taken", "invalid_row"]
+    assert summary == {"object": "import_summary", "created": 2, "failed": 3}
+
+    response = await client.get(f"/api/v1/users/{results[0]['id']}", headers=headers)
+    assert response.json()["username"] == rows[0]["username"]
+
+
+async def test_import_reads_csv(client, create_admin):
+    _, headers = await create_admin()
+    row = _row()
+    body = "firstname,lastname,email,username,password\n" + ",".join(row.values()) + "\nonly,three,columns\n"
+
+    *results, summary = await _import(client, headers, body, content_type="text/csv")
+
+    assert [result["status"] for result in results] == ["created", "failed"]
+    assert summary["created"] == 1
+
+
+async def test_import_retries_row_by_row_when_a_signup_races_the_batch(client, create_admin, monkeypatch):
+    _, headers = await create_admin()
+    rows = [_row(), _row(), _row()]
+    hash_passwords = services._hash_passwords
+
+    async def signup_during_hashing(passwords):
+        # Claims the second row's username after the batch's conflict query has run
+        response = await client.post("/api/v1/auth/signup", json={**_row(), "username": rows[1]["username"]})
+        assert response.status_code == 201
+        return await hash_passwords(passwords)
+
+    monkeypatch.setattr(services, "_hash_passwords", signup_during_hashing)
+    *results, summary = await _import(client, headers, "\n".join(json.dumps(row) for row in rows))
+
+    assert [result["status"] for result in results] == ["created", "failed", "created"]
+    assert results[1]["error"]["code"] == "username_taken"
+    assert summary == {"object": "import_summary", "created": 2, "failed": 1}
+
+
+async def test_import_is_admin_only(client, create_user):
+    _, headers = await create_user()
+
+    response = await client.post("/api/v1/users/import", content=json.dumps(_row()), headers=headers)
+    assert response.status_code == 403
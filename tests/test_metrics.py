@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+
+from src.config import Config
+from src.database.main import engine
+from src.metrics import db_pool_checkout_duration, http_request_duration
+
+pytestmark = pytest.mark.anyio
+
+
+def _count(child) -> int:
+    return sum(child.counts)
+
+
+async def test_requests_are_labelled_with_the_route_template(client, create_user):
+    user, headers = await create_user()
+    child = http_request_duration.labels("GET", "/api/v1/users/{user_id}", "200")
+    before = _count(child)
+
+    for _ in range(2):
+        response = await client.get(f"/api/v1/users/{user['id']}", headers=headers)
+        assert response.status_code == 200
+    assert _count(child) == before + 2
+
+    response = await client.get("/metrics")
+    assert 'route="/api/v1/users/{user_id}",status="200"' in response.text
+    assert user["id"] not in response.text
+
+
+async def test_pool_checkouts_are_timed_after_dispose():
+    child = db_pool_checkout_duration.labels("primary")
+    await engine.dispose()
+    before = _count(child)
+
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    assert _count(child) == before + 1
+
+
+async def test_unknown_methods_share_one_label(client):
+    child = http_request_duration.labels("OTHER", "unmatched", "404")
+    before = _count(child)
+
+    for method in ("PURGE", "X-RANDOM-1", "X-RANDOM-2"):
+        await client.request(method, "/nowhere")
+
+    assert _count(child) == before + 3
+    assert "X-RANDOM" not in (await client.get("/metrics")).text
+
+
+async def test_metrics_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_TOKEN", "scrape-secret")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 401
+    assert response.json()["error"]["code"] == "invalid_token"
+    response = await client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+    response = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
@@ -0,0 +1,64 @@
+import pytest
+
+from src.query_budget import assert_max_queries, collect_queries
+from src.users.cache import user_cache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def caller_and_target(client, create_user):
+    """A signed-in caller, already in the authenticated-user cache, and another user to act on."""
+    caller, headers = await create_user()
+    target, _ = await create_user()
+    response = await client.get(f"/api/v1/users/{caller['id']}", headers=headers)
+    assert response.status_code == 200
+    return caller, headers, target
+
+
+async def test_get_user_by_id_runs_one_query(client, caller_and_target):
+    _, headers, other = caller_and_target
+
+    with assert_max_queries(1):
+        response = await client.get(f"/api/v1/users/{other['id']}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith('db;desc="1 query"')
+
+
+async def test_get_user_by_id_loads_the_caller_once(client, create_user):
+    _, headers = await create_user()
+    other, _ = await create_user()
+    user_cache.clear()
+
+    with assert_max_queries(2):
+        response = await client.get(f"/api/v1/users/{other['id']}", headers=headers)
+    assert response.status_code == 200
+
+
+async def test_update_user_runs_one_query(client, caller_and_target):
+    _, headers, other = caller_and_target
+
+    with assert_max_queries(1):
+        response = await client.patch(f"/api/v1/users/{other['id']}", json={"firstname": "Renamed"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["firstname"] == "Renamed"
+
+
+async def test_failed_statements_are_counted(client, caller_and_target):
+    user, headers, other = caller_and_target
+
+    with collect_queries() as stats:
+        response = await client.patch(f"/api/v1/users/{other['id']}", json={"email": user["email"]}, headers=headers)
+    assert response.status_code == 409
+    assert stats.count == 1
+    assert response.headers["Server-Timing"].startswith('db;desc="1 query"')
+
+
+async def test_assert_max_queries_reports_the_statements(client, caller_and_target):
+    _, headers, other = caller_and_target
+
+    with pytest.raises(AssertionError, match=r"Expected at most 0 queries, 1 were run") as excinfo:
+        with assert_max_queries(0):
+            await client.get(f"/api/v1/users/{other['id']}", headers=headers)
+    assert "FROM users WHERE" in str(excinfo.value)
+    assert "src/users/services.py" in str(excinfo.value)
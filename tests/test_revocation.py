@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from benchmarks.inmemory_redis import InMemoryRedis
+from src.config import Config
+from src.database import redis as blocklist
+from src.database.blocklist import (
+    REVOKED_JTI_EXPIRIES_KEY,
+    REVOKED_JTIS_KEY,
+    InMemoryBlocklistBackend,
+    RedisBlocklistBackend,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = InMemoryRedis()
+    monkeypatch.setattr(blocklist, "blocklist_backend", RedisBlocklistBackend(fake))
+    monkeypatch.setattr(blocklist, "revoked_jti_filter", blocklist.RevokedJtiFilter(
+        capacity=100, error_rate=0.001, sync_interval=1.0
+    ))
+    return fake
+
+
+async def _login(client, create_user) -> tuple[dict, dict]:
+    user, _ = await create_user()
+    response = await client.post("/api/v1/auth/login", json={"email": user["email"], "password": "password123"})
+    assert response.status_code == 200
+    return user, response.json()
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_logout_revokes_only_that_token(client, create_user):
+    _, first = await _login(client, create_user)
+    _, headers = await create_user()
+
+    response = await client.post("/api/v1/auth/logout", headers=_bearer(first["access_token"]))
+    assert response.status_code == 200
+
+    response = await client.get("/api/v1/users/me", headers=_bearer(first["access_token"]))
+    assert response.status_code == 403
+    assert response.json()["error"]["code"] == "token_revoked"
+    assert (await client.get("/api/v1/users/me", headers=headers)).status_code == 200
+
+
+async def test_logout_all_revokes_every_session_of_the_user(client, create_user):
+    user, first = await _login(client, create_user)
+    response = await client.post("/api/v1/auth/login", json={"email": user["email"], "password": "password123"})
+    second = response.json()
+
+    response = await client.post("/api/v1/auth/logout_all", headers=_bearer(first["access_token"]))
+    assert response.status_code == 200
+
+    for tokens in (first, second):
+        response = await client.get("/api/v1/users/me", headers=_bearer(tokens["access_token"]))
+        assert response.json()["error"]["code"] == "token_revoked"
+        response = await client.post("/api/v1/auth/refresh_token", headers=_bearer(tokens["refresh_token"]))
+        assert response.json()["error"]["code"] == "token_revoked"
+
+    # Tokens issued afterwards carry the new version
+    response = await client.post("/api/v1/auth/login", json={"email": user["email"], "password": "password123"})
+    response = await client.get("/api/v1/users/me", headers=_bearer(response.json()["access_token"]))
+    assert response.status_code == 200
+
+
+async def test_revocations_stay_bounded_in_redis_without_the_filter(redis, monkeypatch):
+    monkeypatch.setattr(Config, "BLOCKLIST_FILTER_ENABLED", False)
+    hour_ago = time.time() - 3600
+    for i in range(50):
+        await blocklist.blocklist_backend.add(f"old-{i}", 60, hour_ago)
+
+    await blocklist.add_jti_to_blocklist("new", expires_at=time.time() + 60)
+
+    assert list(redis._zsets[REVOKED_JTIS_KEY]) == ["new"]
+    assert list(redis._zsets[REVOKED_JTI_EXPIRIES_KEY]) == ["new"]
+
+
+async def test_revocations_stay_bounded_in_memory():
+    backend = InMemoryBlocklistBackend()
+    hour_ago = time.time() - 3600
+    for i in range(50):
+        await backend.add(f"old-{i}", 60, hour_ago)
+
+    await backend.add("new", 60, time.time())
+
+    assert list(backend._expiries) == ["new"]
+    assert [jti for _, jti in backend._log] == ["new"]
+    assert len(backend._expiry_heap) == 1
+
+
+async def test_revocations_logged_by_an_older_release_reach_the_filter(redis):
+    # Before expiries were tracked, the log was the only record of a revocation
+    redis._set("legacy", "", ex=1800)
+    redis._zadd(REVOKED_JTIS_KEY, {"legacy": time.time() - 1800, "expired": time.time() - 3600})
+
+    await blocklist.reconcile_revocations()
+    await blocklist.add_jti_to_blocklist("new", expires_at=time.time() + 60)  # Trims the log
+    await blocklist.revoked_jti_filter.rebuild()
+
+    assert blocklist.revoked_jti_filter.might_contain("legacy")
+    assert set(redis._zsets[REVOKED_JTI_EXPIRIES_KEY]) == {"legacy", "new"}
@@ -0,0 +1,96 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from src.database.main import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def signup(client):
+    async def create(firstname: str, lastname: str) -> dict:
+        name = uuid.uuid4().hex[:12]
+        response = await client.post("/api/v1/auth/signup", json={
+            "email": f"{name}@example.com", "password": "password123",
+            "firstname": firstname, "lastname": lastname, "username": name,
+        })
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return create
+
+
+async def _search(client, headers, q: str, **params) -> dict:
+    response = await client.get("/api/v1/users/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _token() -> str:
+    return "z" + uuid.uuid4().hex[:10]  # Letters first, so no other user's name starts with it
+
+
+async def test_every_term_must_match_as_a_prefix(client, create_admin, signup):
+    _, headers = await create_admin()
+    first, last = _token(), _token()
+    match = await signup(first, last)
+    await signup(first, _token())
+
+    page = await _search(client, headers, f"{first[:6]} {last[:6]}")
+
+    assert [user["id"] for user in page["data"]] == [match["id"]]
+    assert "rank" not in page["data"][0]
+
+
+async def test_fts_syntax_in_the_query_is_matched_literally(client, create_admin):
+    _, headers = await create_admin()
+
+    page = await _search(client, headers, 'NEAR( "unbalanced OR *')
+    assert page["data"] == []
+
+
+async def test_index_follows_updates_and_deletes(client, create_admin, signup):
+    _, headers = await create_admin()
+    old, new = _token(), _token()
+    user = await signup(old, "User")
+
+    response = await client.patch(f"/api/v1/users/{user['id']}", json={"firstname": new}, headers=headers)
+    assert response.status_code == 200
+    assert (await _search(client, headers, old))["data"] == []
+    assert [hit["id"] for hit in (await _search(client, headers, new))["data"]] == [user["id"]]
+
+    response = await client.delete(f"/api/v1/users/{user['id']}/hard", headers=headers)
+    assert response.status_code == 204
+    async with AsyncSessionLocal() as session:
+        indexed = (await session.execute(
+            text("SELECT rowid FROM users_fts WHERE users_fts MATCH :term"), {"term": new}
+        )).all()
+    assert indexed == []
+
+
+async def test_soft_deleted_users_are_not_found(client, create_admin, signup):
+    _, headers = await create_admin()
+    name = _token()
+    user = await signup(name, "User")
+
+    response = await client.delete(f"/api/v1/users/{user['id']}", headers=headers)
+    assert response.status_code == 204
+    assert (await _search(client, headers, name))["data"] == []
+
+
+async def test_pages_walk_tied_ranks_in_id_order(client, create_admin, signup):
+    _, headers = await create_admin()
+    name = _token()
+    users = [await signup(name, "Same") for _ in range(5)]  # Identical documents rank equally
+
+    seen, cursor = [], None
+    while True:
+        page = await _search(client, headers, name, limit=2, **({"starting_after": cursor} if cursor else {}))
+        seen += [user["id"] for user in page["data"]]
+        if not page["has_more"]:
+            break
+        cursor = page["next_cursor"]
+
+    assert seen == sorted((user["id"] for user in users), key=lambda user_id: uuid.UUID(user_id).hex)
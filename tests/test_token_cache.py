@@ -0,0 +1,33 @@
+import time
+
+from src.auth.utils import VerifiedTokenCache
+
+
+def test_invalid_tokens_are_remembered_briefly():
+    cache = VerifiedTokenCache(max_size=10, negative_ttl_seconds=60, negative_max_size=10)
+    key = cache.key("junk")
+    cache.put(key, None)
+
+    assert cache.get(key) == (True, None)
+
+
+def test_junk_tokens_cannot_evict_valid_ones():
+    cache = VerifiedTokenCache(max_size=2, negative_ttl_seconds=60, negative_max_size=3)
+    valid = cache.key("valid")
+    payload = {"exp": time.time() + 60}
+    cache.put(valid, payload)
+
+    for i in range(100):
+        cache.put(cache.key(f"junk-{i}"), None)
+
+    assert cache.get(valid) == (True, payload)
+    assert len(cache._invalid) == 3
+    assert cache.get(cache.key("junk-0")) == (False, None)  # The oldest junk was evicted instead
+
+
+def test_expired_payloads_are_dropped():
+    cache = VerifiedTokenCache(max_size=10, negative_ttl_seconds=60, negative_max_size=10)
+    key = cache.key("expired")
+    cache.put(key, {"exp": time.time() - 1})
+
+    assert cache.get(key) == (False, None)
@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+
+from src.users.cache import AuthenticatedUserCache, user_cache
+from src.users.models import User
+
+
+def _user(**overrides) -> User:
+    name = uuid.uuid4().hex[:12]
+    values = dict(
+        id=uuid.uuid4(), firstname="Test", lastname="User", email=f"{name}@example.com",
+        username=name, role="user", hashed_password="x", version=1,
+    )
+    return User(**{**values, **overrides})
+
+
+def test_invalidating_a_user_keeps_the_others_cached():
+    cache = AuthenticatedUserCache(max_size=10, ttl_seconds=60)
+    alice, bob = _user(), _user()
+    cache.put(alice, cache.snapshot())
+    cache.put(bob, cache.snapshot())
+
+    cache.invalidate_local(alice.id)
+
+    assert cache.get(alice.email) is None
+    assert cache.get(bob.email).id == bob.id
+
+
+def test_a_lookup_that_raced_with_an_invalidation_is_not_cached():
+    cache = AuthenticatedUserCache(max_size=10, ttl_seconds=60)
+    alice, bob = _user(), _user()
+    snapshot = cache.snapshot()  # Both rows are read from the database after this
+    cache.invalidate_local(alice.id)
+
+    cache.put(alice, snapshot)
+    cache.put(bob, snapshot)
+
+    assert cache.get(alice.email) is None
+    assert cache.get(bob.email) is not None
+
+
+def test_clear_turns_away_lookups_begun_before_it():
+    cache = AuthenticatedUserCache(max_size=10, ttl_seconds=60)
+    alice = _user()
+    snapshot = cache.snapshot()
+    cache.clear()
+
+    cache.put(alice, snapshot)
+    assert cache.get(alice.email) is None
+    cache.put(alice, cache.snapshot())
+    assert cache.get(alice.email) is not None
+
+
+def test_invalidation_history_is_bounded():
+    cache = AuthenticatedUserCache(max_size=2, ttl_seconds=60)
+    alice = _user()
+    snapshot = cache.snapshot()
+    cache.invalidate_local(alice.id)
+    for _ in range(5):
+        cache.invalidate_local(uuid.uuid4())
+
+    assert len(cache._invalidated_at) == 2
+    cache.put(alice, snapshot)  # Alice's invalidation was trimmed, so the old lookup must still be refused
+    assert cache.get(alice.email) is None
+
+
+@pytest.mark.anyio
+async def test_updating_one_user_does_not_evict_other_callers(client, create_user):
+    caller, headers = await create_user()
+    other, _ = await create_user()
+    response = await client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+
+    response = await client.patch(f"/api/v1/users/{other['id']}", json={"firstname": "Renamed"}, headers=headers)
+    assert response.status_code == 200
+
+    hits = user_cache.hits
+    response = await client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+    assert user_cache.hits == hits + 1